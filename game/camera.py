@@ -0,0 +1,73 @@
+import pygame
+
+
+class Camera:
+    def __init__(self, view_width, view_height, map_width, map_height, min_zoom=0.25, max_zoom=2.0):
+        """
+        A scrollable, zoomable view onto a battlefield larger than the window.
+        - view_width / view_height: Size of the window in pixels.
+        - map_width / map_height: Size of the world in world units.
+        - (x, y) is the world position shown at the top-left corner of the window.
+        """
+        self.view_width = view_width
+        self.view_height = view_height
+        self.map_width = map_width
+        self.map_height = map_height
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.zoom = 1.0
+        self.x = 0.0
+        self.y = 0.0
+        self.clamp()
+
+    def world_to_screen(self, x, y):
+        """Convert a world position to window pixels."""
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def screen_to_world(self, x, y):
+        """Convert a window pixel position to world coordinates."""
+        return x / self.zoom + self.x, y / self.zoom + self.y
+
+    def scale(self, length):
+        """Convert a world length to window pixels."""
+        return length * self.zoom
+
+    def view_rect(self):
+        """Return the world-space pygame.Rect currently covered by the window."""
+        return pygame.Rect(
+            int(self.x), int(self.y),
+            int(self.view_width / self.zoom) + 1, int(self.view_height / self.zoom) + 1
+        )
+
+    def pan(self, dx, dy):
+        """Move the view by a distance in window pixels."""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, factor, screen_pos):
+        """Multiply the zoom by factor, keeping the world point under screen_pos fixed."""
+        world_x, world_y = self.screen_to_world(*screen_pos)
+        self.zoom = max(self.min_zoom, min(self.max_zoom, self.zoom * factor))
+        self.x = world_x - screen_pos[0] / self.zoom
+        self.y = world_y - screen_pos[1] / self.zoom
+        self.clamp()
+
+    def center_on(self, x, y):
+        """Center the view on a world position."""
+        self.x = x - self.view_width / self.zoom / 2
+        self.y = y - self.view_height / self.zoom / 2
+        self.clamp()
+
+    def clamp(self):
+        """Keep the view inside the map, or centered on it when the map is smaller than the view."""
+        visible_width = self.view_width / self.zoom
+        visible_height = self.view_height / self.zoom
+        if visible_width >= self.map_width:
+            self.x = (self.map_width - visible_width) / 2
+        else:
+            self.x = max(0.0, min(self.x, self.map_width - visible_width))
+        if visible_height >= self.map_height:
+            self.y = (self.map_height - visible_height) / 2
+        else:
+            self.y = max(0.0, min(self.y, self.map_height - visible_height))
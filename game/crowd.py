@@ -0,0 +1,46 @@
+from typing import NamedTuple
+
+
+class Cluster(NamedTuple):
+    """Aggregate of the troops of one team that share a grid cell."""
+    is_enemy: bool
+    x: float  # Centroid of the members
+    y: float
+    count: int
+    health: float  # Summed health of the members
+    max_health: float  # Summed max health of the members
+
+
+def partition_crowds(troops, cell_size, threshold):
+    """
+    Split troops into ones to draw individually and dense clusters to draw as one glyph.
+    - troops: Iterable of TroopSnapshot.
+    - cell_size: Grid cell size in world units; troops of the same team in a cell are grouped.
+    - threshold: Minimum number of troops in a cell for it to become a Cluster.
+    Returns (individuals, clusters).
+    """
+    cells = {}
+    for troop in troops:
+        key = (troop.is_enemy, int(troop.x // cell_size), int(troop.y // cell_size))
+        members = cells.get(key)
+        if members is None:
+            cells[key] = [troop]
+        else:
+            members.append(troop)
+
+    individuals = []
+    clusters = []
+    for (is_enemy, _, _), members in cells.items():
+        count = len(members)
+        if count < threshold:
+            individuals.extend(members)
+            continue
+        clusters.append(Cluster(
+            is_enemy=is_enemy,
+            x=sum(troop.x for troop in members) / count,
+            y=sum(troop.y for troop in members) / count,
+            count=count,
+            health=sum(troop.health for troop in members),
+            max_health=sum(troop.max_health for troop in members),
+        ))
+    return individuals, clusters
@@ -0,0 +1,404 @@
+import itertools
+import math
+import weakref
+
+import pygame
+
+from settings import TOWER_SIZE, SIMULATION_TICK_RATE
+from game.game_loop import TowerSnapshot, TroopSnapshot
+from game.scheduler import ms_to_ticks
+
+
+class Tower:
+    # Upgrade table shared by every tower (read-only; apply_upgrade changes the tower, not the table)
+    upgrades = {
+        "health": {"value": 50, "cost": 50},
+        "spawn_rate": {"value": -200, "cost": 100},
+        "attack": {"value": 1, "cost": 75},
+    }
+
+    def __init__(self, x, y, id=None, is_enemy=False):
+        self.rect = pygame.Rect(x, y, TOWER_SIZE, TOWER_SIZE)
+        self.health = 100
+        self.max_health = 100  # For percentage calculation
+        self.is_enemy = is_enemy
+        self.upgradeable = not is_enemy  # Enemy structures are only upgradeable when a remote player controls them
+        self.id = id  # Unique identifier for the tower
+        self.spawn_interval = 2000 # in milliseconds
+        self.attack_power = 1
+        self.scheduler = None  # Set by schedule_spawns()
+        self.troops = None  # List spawned troops are appended to
+        self.troop_uids = None  # Match-wide counter spawned troops take their uid from
+        self.last_spawn_tick = 0  # Track last spawn tick
+        self.spawn_event = None  # Pending spawn in the scheduler
+        self.targeted_by = weakref.WeakSet()  # Troops currently targeting this tower
+        self.dead = False
+
+    def apply_upgrade(self, upgrade, player_money):
+        """Apply an upgrade to this specific tower."""
+        if not self.upgradeable:
+            return 0  # Enemy towers cannot be upgraded
+
+        if upgrade == "health" and player_money >= self.upgrades["health"]["cost"]:
+            self.max_health += self.upgrades["health"]["value"]
+            self.health = self.max_health  # Restore to max after upgrade
+            return self.upgrades["health"]["cost"]
+
+        elif upgrade == "spawn_rate" and player_money >= self.upgrades["spawn_rate"]["cost"]:
+            self.spawn_interval = max(1000, self.spawn_interval + self.upgrades["spawn_rate"]["value"])
+            self.reschedule_spawn()  # Apply the shorter interval to the pending spawn
+            return self.upgrades["spawn_rate"]["cost"]
+
+        elif upgrade == "attack" and player_money >= self.upgrades["attack"]["cost"]:
+            self.attack_power += self.upgrades["attack"]["value"]
+            return self.upgrades["attack"]["cost"]
+
+        return 0  # Return 0 if the upgrade can't be applied
+
+    def take_damage(self, amount):
+        """Reduce health; the first time it reaches zero, troops targeting this tower drop it."""
+        self.health -= amount
+        if self.health <= 0 and not self.dead:
+            self.dead = True
+            for troop in list(self.targeted_by):
+                troop.set_target(None)
+
+    def shoot(self, troops):
+        """Damage any troop within the tower's range."""
+        for troop in troops:
+            if self.rect.colliderect(troop.get_rect()):
+                troop.take_damage(1)
+
+    def schedule_spawns(self, scheduler, troops, troop_uids=None):
+        """
+        Start spawning troops through the scheduler at intervals specific to this tower.
+        - scheduler: The match Scheduler.
+        - troops: List new troops are appended to. It must be updated in place, not replaced.
+        - troop_uids: Optional match-wide uid counter, so uids don't depend on other matches in the process.
+        """
+        self.scheduler = scheduler
+        self.troops = troops
+        self.troop_uids = troop_uids
+        self.last_spawn_tick = scheduler.tick
+        self.reschedule_spawn()
+
+    def reschedule_spawn(self):
+        """(Re)queue the next spawn one spawn interval after the last one."""
+        if self.scheduler is None:
+            return
+        if self.spawn_event:
+            self.spawn_event.cancel()
+        interval = ms_to_ticks(self.spawn_interval, SIMULATION_TICK_RATE)
+        self.spawn_event = self.scheduler.schedule_at(
+            max(self.scheduler.tick + 1, self.last_spawn_tick + interval), self.spawn_troop
+        )
+
+    def spawn_troop(self):
+        """Scheduled event: spawn a troop and queue the next one. Destroyed towers stop spawning."""
+        self.spawn_event = None
+        if self.health <= 0:
+            return
+        x = self.rect.centerx
+        y = self.rect.top if not self.is_enemy else self.rect.bottom - 10
+        direction = -1 if self.is_enemy else 1
+        uid = next(self.troop_uids) if self.troop_uids is not None else None
+        troop = Troop(x, y, direction, self.is_enemy, scheduler=self.scheduler, uid=uid)
+        troop.upgradeable = self.upgradeable
+        self.troops.append(troop)
+        self.last_spawn_tick = self.scheduler.tick
+        self.reschedule_spawn()
+
+    def snapshot(self):
+        """Return an immutable copy of the state needed to render this tower."""
+        return TowerSnapshot(self.id, tuple(self.rect), self.health, self.max_health, self.is_enemy)
+
+
+class Base(Tower):  # Base extends Tower for simplicity
+    def __init__(self, x, y, id=None, is_enemy=False):
+        super().__init__(x, y, id=id, is_enemy=is_enemy)
+        self.health = 200  # Bases have more health
+        self.max_health = 200  # For percentage calculation
+        self.id = id  # Unique identifier for the tower
+
+
+class Troop:
+    _next_uid = itertools.count()  # Shared counter for stable troop identifiers
+    tower_detection_radius = 200  # Range at which troops go after enemy towers
+    # Upgrade table shared by every troop (read-only; apply_upgrade changes the troop, not the table)
+    upgrades = {
+        "health": {"value": 5, "cost": 50},
+        "speed": {"value": 0.1, "cost": 75},
+        "attack": {"value": 1, "cost": 100},
+    }
+
+    def __init__(self, x, y, direction, is_enemy=False, audio_manager=None, scheduler=None, uid=None):
+        self.uid = next(Troop._next_uid) if uid is None else uid  # Used to match this troop across render snapshots
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.is_enemy = is_enemy
+        self.upgradeable = not is_enemy  # Overridden by the spawning tower
+        self.health = 10
+        self.max_health = 10  # For calculating percentage
+        self.size = 10
+        self.speed = .5
+        self.attack_power = .1  # Damage per attack
+        self.attacking = False  # Whether the troop is attacking
+        self.attack_start_tick = 0  # Tick the current attack started on; the attack phase is derived from it
+        self._target_ref = None  # Weak reference to the current target, see the target property
+        self.targeted_by = weakref.WeakSet()  # Troops currently targeting this troop
+        self.dead = False
+        self.scheduler = scheduler  # Match scheduler driving attack phases and cooldowns
+        self.audio_manager = audio_manager  # Reference to the global audio manager
+        self.hit_sound = None  # Cached sound
+
+        if self.audio_manager:
+            self.hit_sound = self.audio_manager.load_sound('hit_1.MP3')
+            self.hit_sound.set_volume(0.7)  # Adjust volume level (0.0 to 1.0)
+
+        # Cooldown management
+        self.hit_sound_ready = True  # Cleared while the hit sound is cooling down
+        self.sound_cooldown = 500  # Cooldown in milliseconds
+
+    def apply_upgrade(self, upgrade, player_money):
+        """Apply an upgrade to this specific troop."""
+        if not self.upgradeable:
+            return 0  # Enemy troops cannot be upgraded
+
+        if upgrade == "health" and player_money >= self.upgrades["health"]["cost"]:
+            self.max_health += self.upgrades["health"]["value"]
+            self.health = self.max_health  # Restore to max after upgrade
+            return self.upgrades["health"]["cost"]
+
+        elif upgrade == "speed" and player_money >= self.upgrades["speed"]["cost"]:
+            self.speed += self.upgrades["speed"]["value"]
+            return self.upgrades["speed"]["cost"]
+
+        elif upgrade == "attack" and player_money >= self.upgrades["attack"]["cost"]:
+            self.attack_power += self.upgrades["attack"]["value"]
+            return self.upgrades["attack"]["cost"]
+
+        return 0  # Return 0 if the upgrade can't be applied
+
+    def target_enemy(self, enemies):
+        """
+        Determine the nearest enemy troop within a reasonable range.
+        """
+        detection_radius = 50  # Increase detection radius
+
+        for enemy in enemies:
+            distance = math.hypot(self.x - enemy.x, self.y - enemy.y)
+            if distance <= detection_radius:
+                return enemy  # Return the first enemy troop in range
+
+        return None  # No valid troop targets
+
+    def target_tower(self, enemy_towers):
+        """
+        Determine the nearest enemy tower within a certain range.
+        """
+        detection_radius = self.tower_detection_radius  # Adjust range for detecting towers
+        nearest_tower = None
+        min_distance = float('inf')
+
+        for tower in enemy_towers:
+            if tower.health > 0:  # Only consider alive towers
+                distance = math.hypot(self.x - tower.rect.centerx, self.y - tower.rect.centery)
+                if distance <= detection_radius and distance < min_distance:
+                    nearest_tower = tower
+                    min_distance = distance
+
+        return nearest_tower  # Return the nearest valid tower or None
+
+
+    def move(self, allies, enemies, enemy_towers, flow_field=None, reacquire=True, separation=1):
+        """
+        Handle movement and attacking based on troop targeting, prioritizing enemy troops.
+        - flow_field: Optional FlowField towards enemy_towers. When given, troops without a troop
+          target pick their structure with one grid lookup instead of scanning towers, and around
+          obstacles they also take their heading from it.
+        - reacquire: Whether to scan for new targets this tick. Between scans the cached target is kept;
+          a troop without a target scans regardless.
+        - separation: Strength of this tick's push away from allies; 0 skips the check this tick.
+        """
+        # Separate from allies
+        if separation:
+            self.avoid_allies(allies, separation)
+
+        # Dead targets are dropped by take_damage, so self.target is always alive here
+
+        # Prioritize targeting enemy troops. A troop with a target only rescans on its reacquire
+        # ticks; one without any scans every tick, or it would walk straight past what it should see.
+        scan = reacquire or not self.target
+        steering = None  # (distance, dir_x, dir_y) from the flow field
+        if not self.target or isinstance(self.target, Tower):
+            troop_target = self.target_enemy(enemies) if scan else None
+            if troop_target:
+                self.set_target(troop_target)
+            elif flow_field is not None and flow_field.has_obstacles:
+                tower_target, distance, dir_x, dir_y, _ = flow_field.sample(self.x, self.y)
+                if tower_target is not None and tower_target.health > 0 and distance <= self.tower_detection_radius:
+                    self.set_target(tower_target)
+                    # Next to the tower a cell is too coarse to decide when to attack: use the exact maths
+                    if distance > self.size + flow_field.cell_size:
+                        steering = (distance, dir_x, dir_y)
+            elif flow_field is not None:
+                # The cell's nearest structure is ours unless another is nearly as close or the
+                # detection edge runs through the cell: then decide exactly, like target_tower does
+                tower_target, distance, _, _, contested = flow_field.sample(self.x, self.y)
+                if (
+                    contested
+                    or tower_target is None
+                    or tower_target.health <= 0
+                    or abs(distance - self.tower_detection_radius) <= flow_field.slack
+                ):
+                    tower_target = self.target_tower(enemy_towers)
+                elif distance > self.tower_detection_radius:
+                    tower_target = None
+                if tower_target:
+                    self.set_target(tower_target)
+            elif scan:
+                # If no enemy troops are in range, check for towers in range
+                tower_target = self.target_tower(enemy_towers)
+                if tower_target:
+                    self.set_target(tower_target)
+
+        # Handle movement and attacking
+        if self.target:
+            if steering:  # Heading and distance come straight from the flow field
+                distance_to_target = steering[0]
+            elif isinstance(self.target, Troop):  # If target is an enemy troop
+                dx, dy = self.target.x - self.x, self.target.y - self.y
+            elif isinstance(self.target, Tower):  # If target is a tower
+                dx = self.target.rect.centerx - self.x
+                dy = self.target.rect.centery - self.y
+            else:
+                dx, dy = 0, 0  # Fallback for safety
+
+            if not steering:
+                distance_to_target = math.hypot(dx, dy)
+
+            if distance_to_target > self.size:  # If not in range
+                # Move closer to the target
+                if steering:
+                    self.x += steering[1] * self.speed
+                    self.y += steering[2] * self.speed
+                else:
+                    self.x += (dx / distance_to_target) * self.speed
+                    self.y += (dy / distance_to_target) * self.speed
+                if self.attacking:  # Stop attacking if moving
+                    self.stop_attack()
+            else:
+                # Attack the target when in range
+                if not self.attacking:  # Start attacking if not already doing so
+                    self.start_attack()
+                self.animate_attack()  # Animate the attack
+                self.target.take_damage(self.attack_power)  # Reduce the target's health
+                
+            if self.hit_sound and self.target:
+                # Play hit sound with a cooldown
+                if self.hit_sound_ready:
+                    self.hit_sound.play()
+                    self.hit_sound_ready = False
+                    if self.scheduler:
+                        self.scheduler.schedule(
+                            ms_to_ticks(self.sound_cooldown, SIMULATION_TICK_RATE), self.end_sound_cooldown
+                        )
+        else:
+            # No valid target; move forward
+            if self.attacking:
+                self.stop_attack()
+            self.y -= self.speed * self.direction  # Default movement
+
+
+    @property
+    def target(self):
+        """
+        Current target (troop or structure), or None.
+        Held weakly, so a troop never keeps a dead target alive; take_damage also clears it on death.
+        """
+        return self._target_ref() if self._target_ref is not None else None
+
+    def set_target(self, target):
+        """Change target, keeping the target's targeted_by set in sync so its death can clear us."""
+        current = self.target
+        if target is current:
+            return
+        if current is not None:
+            current.targeted_by.discard(self)
+        self._target_ref = weakref.ref(target) if target is not None else None
+        if target is not None:
+            target.targeted_by.add(self)
+
+    def take_damage(self, amount):
+        """Reduce health; the first time it reaches zero, troops targeting this one drop it."""
+        self.health -= amount
+        if self.health <= 0 and not self.dead:
+            self.dead = True
+            self.set_target(None)
+            for troop in list(self.targeted_by):
+                troop.set_target(None)
+
+    def avoid_allies(self, allies, strength=1):
+        """
+        Adjust horizontal position to avoid overlapping with allies.
+        - strength: Push multiplier, for troops that only separate every few ticks.
+        """
+        for ally in allies:
+            if ally != self and self.get_rect().colliderect(ally.get_rect()):
+                dx = self.x - ally.x
+                distance = abs(dx) if dx != 0 else 1
+                push = strength / distance
+
+                if dx < 0:
+                    self.x -= push
+                else:
+                    self.x += push
+
+    @property
+    def attack_phase(self):
+        """
+        'retreat' for the first 10 ticks of an attack, then 'advance' and 'retreat' alternating every 20 ticks.
+        Computed from the tick the attack started on, so attacks that start and stop every tick cost nothing.
+        """
+        if not self.attacking or self.scheduler is None:
+            return "retreat"
+        elapsed = self.scheduler.tick - self.attack_start_tick
+        if elapsed < 10:  # Retreat duration
+            return "retreat"
+        return "advance" if (elapsed - 10) // 20 % 2 == 0 else "retreat"  # Phase length
+
+    def animate_attack(self):
+        """Handle the attack animation by moving according to the current 'retreat' or 'advance' phase."""
+        if self.attack_phase == "retreat":
+            self.y += self.speed * self.direction  # Move backward slightly
+        else:
+            self.y -= self.speed * self.direction  # Move forward slightly
+
+    def end_sound_cooldown(self):
+        """Scheduled event: allow the hit sound to play again."""
+        self.hit_sound_ready = True
+
+    def start_attack(self):
+        """Start the attacking animation."""
+        if not self.attacking:  # Prevent re-initializing
+            self.attacking = True
+            if self.scheduler:
+                self.attack_start_tick = self.scheduler.tick
+
+    def stop_attack(self):
+        """Stop the attacking animation. The next attack starts over with a retreat."""
+        self.attacking = False
+
+    def snapshot(self):
+        """Return an immutable copy of the state needed to render this troop."""
+        return TroopSnapshot(self.uid, self.x, self.y, self.size, self.health, self.max_health, self.is_enemy)
+
+    def get_rect(self):
+        """Return a pygame.Rect for collision detection."""
+        if self.is_enemy:
+            # Treat the circle as a bounding square for simplicity
+            return pygame.Rect(self.x - self.size // 2, self.y - self.size // 2, self.size, self.size)
+        else:
+            # Return the rectangle directly for the player's troop
+            return pygame.Rect(self.x - self.size // 2, self.y - self.size // 2, self.size, self.size)
@@ -0,0 +1,227 @@
+import copy
+import heapq
+import math
+
+_DIAGONAL = math.sqrt(2)
+_NEIGHBOURS = (
+    (1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+    (1, 1, _DIAGONAL), (1, -1, _DIAGONAL), (-1, 1, _DIAGONAL), (-1, -1, _DIAGONAL),
+)
+
+
+class FlowField:
+    def __init__(self, width, height, cell_size, blocked=()):
+        """
+        A direction grid leading towards the nearest of a set of targets (enemy structures).
+        - width / height: World size covered by the grid.
+        - cell_size: Grid resolution in world units.
+        - blocked: (column, row) cells that cannot be crossed.
+        Each cell stores its nearest target, the distance to it and a unit steering vector,
+        so steering a unit is one lookup. With obstacles the vector follows the shortest 8-connected
+        path around them. Without obstacles "nearest" is the straight-line distance to the target's
+        center, exactly as Troop.target_tower measures it (ties go to the earlier target), and the
+        vector points at that center. Cells where the runner-up is close enough that a unit elsewhere
+        in the cell could see the order flip are marked contested, so units there check exactly.
+        """
+        self.cell_size = cell_size
+        self.cols = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(height / cell_size))
+        count = self.cols * self.rows
+        self.blocked = bytearray(count)
+        for col, row in blocked:
+            self.blocked[row * self.cols + col] = 1
+        self.has_obstacles = any(self.blocked)
+
+        # Any point in a cell is within this distance of its center, so distances measured from the
+        # center are off by at most this much (and the gap between two of them by twice as much)
+        self.slack = cell_size * _DIAGONAL / 2
+        self.targets = []  # Living targets, in the order they were given
+        self.cost = [math.inf] * count  # Path cost in cells (Dijkstra, with obstacles)
+        self.parent = [-1] * count  # Next cell on the path; -1 for seed cells
+        self.owner = [None] * count  # Nearest target
+        self.runner_up = [None] * count  # Second nearest target (without obstacles)
+        self.contested = bytearray(count)  # 1 where the runner-up is within 2 * slack of the owner
+        self.distance = [math.inf] * count  # World distance to the owner
+        self.dir_x = [0.0] * count
+        self.dir_y = [0.0] * count
+
+    def build(self, targets):
+        """
+        Compute the whole field from scratch.
+        - targets: Objects with a pygame-style .rect (only living ones should be passed).
+        """
+        count = self.cols * self.rows
+        self.targets = list(targets)
+        self.cost = [math.inf] * count
+        self.parent = [-1] * count
+        self.owner = [None] * count
+        self.runner_up = [None] * count
+        self.contested = bytearray(count)
+        if not self.has_obstacles:
+            self._rank(range(count))
+            self._finalize(range(count))
+            return
+        seeds = {}  # One seed per cell, so overlapping targets never tie in the heap
+        for target in targets:
+            for seed in self._seeds(target):
+                seeds.setdefault(seed[1], seed)
+        heap = list(seeds.values())
+        heapq.heapify(heap)
+        self._finalize(self._propagate(heap))
+
+    def clone(self, owners):
+        """
+        Copy the field for another set of identical targets.
+        - owners: {target in this field: the target standing in the same place in the copy}.
+        Building is the expensive part, so matches sharing a map layout can build one field and clone it.
+        """
+        field = copy.copy(self)  # blocked is never modified after construction, so it is shared
+        field.targets = [owners[target] for target in self.targets]
+        field.cost = self.cost[:]
+        field.parent = self.parent[:]
+        field.contested = self.contested[:]
+        field.distance = self.distance[:]
+        field.dir_x = self.dir_x[:]
+        field.dir_y = self.dir_y[:]
+        field.owner = [owners[owner] if owner is not None else None for owner in self.owner]
+        field.runner_up = [owners[target] if target is not None else None for target in self.runner_up]
+        return field
+
+    def remove_target(self, target):
+        """
+        Incrementally drop a destroyed target: only the cells it owned (or was runner-up in) are
+        recomputed. With obstacles they are flooded in from the surrounding cells that still lead to
+        a living target.
+        """
+        if target in self.targets:
+            self.targets.remove(target)
+        if not self.has_obstacles:
+            cells = [
+                i for i, (cell_owner, runner_up) in enumerate(zip(self.owner, self.runner_up))
+                if cell_owner is target or runner_up is target
+            ]
+            self._rank(cells)
+            self._finalize(cells)
+            return
+
+        cols, rows = self.cols, self.rows
+        owner = self.owner
+        invalid = [i for i, cell_owner in enumerate(owner) if cell_owner is target]
+        for i in invalid:
+            self.cost[i] = math.inf
+            self.parent[i] = -1
+            owner[i] = None
+
+        heap = []
+        for i in invalid:
+            row, col = divmod(i, cols)
+            for dc, dr, step in _NEIGHBOURS:
+                c, r = col + dc, row + dr
+                if 0 <= c < cols and 0 <= r < rows:
+                    j = r * cols + c
+                    if owner[j] is not None:
+                        heap.append((self.cost[j] + step, i, j, owner[j]))
+        heapq.heapify(heap)
+        changed = self._propagate(heap)
+        self._finalize(set(invalid) | changed)
+
+    def sample(self, x, y):
+        """
+        Return (target, distance, dir_x, dir_y, contested) for a world position.
+        target is None if unreachable. distance is measured from the cell's center.
+        Positions off the grid use the nearest edge cell and always count as contested.
+        """
+        col = int(x // self.cell_size)
+        row = int(y // self.cell_size)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            i = row * self.cols + col
+            contested = self.contested[i]
+        else:
+            i = min(self.rows - 1, max(0, row)) * self.cols + min(self.cols - 1, max(0, col))
+            contested = 1
+        return self.owner[i], self.distance[i], self.dir_x[i], self.dir_y[i], contested
+
+    def _cell_center(self, i):
+        row, col = divmod(i, self.cols)
+        return (col + 0.5) * self.cell_size, (row + 0.5) * self.cell_size
+
+    def _rank(self, cells):
+        """Without obstacles: find the nearest and second nearest target center from each cell's center."""
+        centers = [(target, target.rect.centerx, target.rect.centery) for target in self.targets]
+        tie_range = 2 * self.slack
+        for i in cells:
+            x, y = self._cell_center(i)
+            best = second = math.inf
+            owner = runner_up = None
+            for target, target_x, target_y in centers:
+                distance = math.hypot(target_x - x, target_y - y)
+                if distance < best:  # Strictly closer, like Troop.target_tower: ties keep the earlier target
+                    second, runner_up = best, owner
+                    best, owner = distance, target
+                elif distance < second:
+                    second, runner_up = distance, target
+            self.owner[i] = owner
+            self.runner_up[i] = runner_up
+            self.contested[i] = second - best <= tie_range
+
+    def _seeds(self, target):
+        """Heap entries for the cells covered by a target's rect."""
+        size = self.cell_size
+        rect = target.rect
+        seeds = []
+        for row in range(max(0, int(rect.top // size)), min(self.rows, int((rect.bottom - 1) // size) + 1)):
+            for col in range(max(0, int(rect.left // size)), min(self.cols, int((rect.right - 1) // size) + 1)):
+                i = row * self.cols + col
+                if not self.blocked[i]:
+                    seeds.append((0.0, i, -1, target))
+        return seeds
+
+    def _propagate(self, heap):
+        """Multi-source Dijkstra over the grid. Returns the set of cells that were updated."""
+        cols, rows = self.cols, self.rows
+        cost, parent, owner, blocked = self.cost, self.parent, self.owner, self.blocked
+        changed = set()
+        while heap:
+            d, i, from_cell, target = heapq.heappop(heap)
+            if d >= cost[i]:
+                continue
+            cost[i] = d
+            parent[i] = from_cell
+            owner[i] = target
+            changed.add(i)
+            row, col = divmod(i, cols)
+            for dc, dr, step in _NEIGHBOURS:
+                c, r = col + dc, row + dr
+                if 0 <= c < cols and 0 <= r < rows:
+                    j = r * cols + c
+                    if blocked[j]:
+                        continue
+                    new_cost = d + step
+                    if new_cost < cost[j]:
+                        heapq.heappush(heap, (new_cost, j, i, target))
+        return changed
+
+    def _finalize(self, cells):
+        """Derive distance and steering vectors for the given cells."""
+        for i in cells:
+            target = self.owner[i]
+            if target is None:
+                self.distance[i] = math.inf
+                self.dir_x[i] = self.dir_y[i] = 0.0
+                continue
+
+            x, y = self._cell_center(i)
+            if self.has_obstacles and self.parent[i] != -1:
+                # Follow the path: head for the next cell, distance is the path length
+                next_x, next_y = self._cell_center(self.parent[i])
+                self.distance[i] = self.cost[i] * self.cell_size
+            else:
+                next_x, next_y = target.rect.centerx, target.rect.centery
+                self.distance[i] = math.hypot(next_x - x, next_y - y)
+            dx, dy = next_x - x, next_y - y
+            length = math.hypot(dx, dy)
+            if length:
+                self.dir_x[i] = dx / length
+                self.dir_y[i] = dy / length
+            else:
+                self.dir_x[i] = self.dir_y[i] = 0.0
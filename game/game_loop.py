@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import NamedTuple
+
+
+class TowerSnapshot(NamedTuple):
+    """Immutable render state of a tower for a single simulation tick."""
+    id: int  # Stable identifier, unique within the match
+    rect: tuple  # (x, y, width, height)
+    health: float
+    max_health: float
+    is_enemy: bool
+
+
+class TroopSnapshot(NamedTuple):
+    """Immutable render state of a troop for a single simulation tick."""
+    uid: int  # Stable identifier used to match troops between ticks
+    x: float
+    y: float
+    size: int
+    health: float
+    max_health: float
+    is_enemy: bool
+
+
+class FrameSnapshot(NamedTuple):
+    """Everything the renderer needs to draw one finished simulation tick."""
+    tick: int
+    time: float  # time.perf_counter() when the tick was published
+    towers: tuple
+    troops: tuple
+    troop_index: dict  # uid -> TroopSnapshot, for matching troops between ticks (read-only)
+    player_money: int
+    enemy_money: int
+
+
+class SnapshotBuffer:
+    def __init__(self):
+        """
+        Double buffer of finished simulation ticks.
+        - The simulation publishes into the back slot.
+        - The renderer reads the latest front pair (previous, latest) to interpolate between.
+        """
+        self._lock = threading.Lock()
+        self._previous = None
+        self._latest = None
+
+    def publish(self, snapshot):
+        """Swap a newly finished snapshot in; the old latest becomes the previous one."""
+        with self._lock:
+            self._previous = self._latest
+            self._latest = snapshot
+
+    def read(self):
+        """Return the (previous, latest) snapshot pair. Either may be None early on."""
+        with self._lock:
+            return self._previous, self._latest
+
+
+def interpolate(previous, troops, alpha):
+    """
+    Blend troop positions from the previous snapshot towards the given (latest) troops.
+    - troops: TroopSnapshots from the latest snapshot, typically only the visible ones.
+    - alpha: 0.0 draws the previous tick, 1.0 draws the latest tick.
+    Troops that only exist in the latest snapshot are drawn where they are.
+    Returns a list of TroopSnapshot.
+    """
+    if previous is None or alpha >= 1.0:
+        return list(troops)
+
+    previous_index = previous.troop_index
+    blended = []
+    for troop in troops:
+        before = previous_index.get(troop.uid)
+        if before is None:
+            blended.append(troop)
+            continue
+        x = before.x + (troop.x - before.x) * alpha
+        y = before.y + (troop.y - before.y) * alpha
+        blended.append(troop._replace(x=x, y=y))
+    return blended
+
+
+class SimulationWorker(threading.Thread):
+    def __init__(self, step, publish, tick_rate):
+        """
+        Run the simulation on its own thread at a fixed tick rate.
+        - step: Callable that advances the simulation one tick and returns a FrameSnapshot.
+        - publish: Callable receiving each finished snapshot (e.g. SnapshotBuffer.publish).
+        - tick_rate: Simulation ticks per second.
+        """
+        super().__init__(name="simulation", daemon=True)
+        self.step = step
+        self.publish = publish
+        self.tick_interval = 1.0 / tick_rate
+        self._stop_event = threading.Event()
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            snapshot = self.step()
+            if snapshot is None:
+                break  # The simulation has finished (e.g. a base was destroyed)
+            self.publish(snapshot)
+
+            next_tick += self.tick_interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            elif delay < -self.tick_interval * 5:
+                next_tick = time.perf_counter()  # Fell far behind; don't try to catch up in a burst
+
+    def stop(self):
+        """Ask the worker to finish its current tick and exit."""
+        self._stop_event.set()
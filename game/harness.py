@@ -0,0 +1,305 @@
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+
+from settings import (
+    MAP_WIDTH, MAP_HEIGHT, SIMULATION_TICK_RATE,
+    HARNESS_POSITION_TOLERANCE, HARNESS_HEALTH_TOLERANCE, HARNESS_TICKS,
+    HARNESS_WINDOW,
+    QUALITY_SEPARATION_INTERVAL,
+)
+from game.state import GameState
+
+# Simulation backends, as GameState options. "reference" is the original scalar simulation:
+# every troop scans for targets and computes its own heading every tick.
+# Register new fast paths here so every scenario checks them against the reference.
+BACKENDS = {
+    "reference": dict(flow_fields=False, staggered_targeting=False),
+    "flow_fields": dict(flow_fields=True, staggered_targeting=False),
+    "staggered": dict(flow_fields=False, staggered_targeting=True),
+    "fast": dict(flow_fields=True, staggered_targeting=True),
+    "coarse_separation": dict(flow_fields=False, staggered_targeting=False, separation_interval=QUALITY_SEPARATION_INTERVAL),
+}
+
+# How closely a backend has to follow the reference, when comparing aggregates (see compare_aggregates).
+# - kills / money / structures: (absolute, fraction of the reference value) each side's kill count,
+#   money and total structure health may differ by at every checkpoint.
+# - winner: "same" (the same outcome, at most HARNESS_WINDOW ticks apart) or "not_reversed"
+#   (the match may still be running when the reference's has ended, but never end the other way).
+Tolerance = namedtuple("Tolerance", "kills money structures winner")
+
+# Backends that compute the same decisions faster are compared exactly (None): every troop and
+# structure after every tick, within the position and health tolerances (compare).
+# Backends that change decisions by design are compared on what decides the match, every
+# HARNESS_WINDOW ticks. Staggered targeting notices new enemies a few ticks late, so single troops
+# drift apart within seconds while kills and structure damage stay close. Coarse separation pushes
+# troops apart in bigger steps, which reshapes crowds enough to change how fast a siege goes.
+PROFILES = {
+    "flow_fields": None,
+    "staggered": Tolerance(kills=(3, 0.05), money=(30, 0.05), structures=(25, 0.1), winner="same"),
+    "fast": Tolerance(kills=(3, 0.05), money=(30, 0.05), structures=(25, 0.1), winner="same"),
+    "coarse_separation": Tolerance(kills=(10, 0.1), money=(100, 0.1), structures=(100, 0.25), winner="not_reversed"),
+}
+
+SCENARIO_KINDS = ("spawn_storm", "siege", "upgrades")
+
+# actions: {tick: [("spawn", side, x, y) or ("upgrade", side, key), ...]}, applied before the tick is stepped
+Scenario = namedtuple("Scenario", "kind seed ticks money actions")
+Divergence = namedtuple("Divergence", "tick what reference candidate")
+
+
+def make_scenario(kind, seed, ticks=HARNESS_TICKS):
+    """
+    Generate a reproducible scenario.
+    - spawn_storm: Bursts of troops for both sides all over their half of the map.
+    - siege: A large force starts next to the enemy structures while defenders trickle in.
+    - upgrades: Rich sides buying random upgrades throughout the match.
+    """
+    rng = random.Random(f"{kind}:{seed}")
+    actions = {}
+    money = (5000, 100)
+
+    def spawn(tick, side, x, y):
+        actions.setdefault(tick, []).append(("spawn", side, x, y))
+
+    def own_half(side):
+        top, bottom = (MAP_HEIGHT / 2, MAP_HEIGHT - 50) if side == 0 else (50, MAP_HEIGHT / 2)
+        return rng.uniform(10, MAP_WIDTH - 10), rng.uniform(top, bottom)
+
+    if kind == "spawn_storm":
+        for tick in range(1, ticks, rng.randint(5, 20)):
+            for side in (0, 1):
+                for _ in range(rng.randint(0, 15)):
+                    spawn(tick, side, *own_half(side))
+    elif kind == "siege":
+        attacker = rng.randint(0, 1)
+        # Structures are laid out the same in every GameState, so any instance shows where they are
+        towers = GameState.build_towers(is_enemy=attacker == 0)
+        for _ in range(rng.randint(50, 150)):
+            tower = rng.choice(towers)
+            x = min(MAP_WIDTH - 10, max(10, tower.rect.centerx + rng.uniform(-120, 120)))
+            y = min(MAP_HEIGHT - 10, max(10, tower.rect.centery + rng.uniform(-120, 120)))
+            spawn(1, attacker, x, y)
+        for tick in range(1, ticks, 30):
+            spawn(tick, 1 - attacker, *own_half(1 - attacker))
+    elif kind == "upgrades":
+        money = (rng.randint(500, 5000), rng.randint(500, 5000))
+        for tick in range(1, ticks):
+            for side in (0, 1):
+                if rng.random() < 0.03:
+                    actions.setdefault(tick, []).append(("upgrade", side, (rng.randrange(4), rng.randrange(3))))
+            if rng.random() < 0.05:
+                side = rng.randint(0, 1)
+                spawn(tick, side, *own_half(side))
+    else:
+        raise ValueError(f"Unknown scenario kind: {kind}")
+
+    return Scenario(kind, seed, ticks, money, actions)
+
+
+def new_state(backend, scenario):
+    """A fresh GameState for a scenario. Both sides are upgradeable so upgrade sequences apply to either."""
+    state = GameState(enemy_upgradeable=True, **BACKENDS[backend])
+    state.player_money, state.enemy_money = scenario.money
+    return state
+
+
+def advance(state, scenario):
+    """Apply the scenario's actions for the next tick and step it."""
+    tick = state.tick + 1
+    inputs = ([], [])
+    for action in scenario.actions.get(tick, ()):
+        if action[0] == "spawn":
+            state.spawn_troop(action[1], action[2], action[3])
+        else:
+            inputs[action[1]].append(action[2])
+    state.step(list(enumerate(inputs)))
+
+
+def compare(reference, candidate, position_tolerance, health_tolerance):
+    """Return the first Divergence between two states after the same tick, or None."""
+    tick = reference.tick
+    for what in ("player_money", "enemy_money", "outcome"):
+        if getattr(reference, what) != getattr(candidate, what):
+            return Divergence(tick, what, getattr(reference, what), getattr(candidate, what))
+
+    for what in ("player_towers", "enemy_towers"):
+        expected = [(tower.id, tower.health) for tower in getattr(reference, what)]
+        actual = [(tower.id, tower.health) for tower in getattr(candidate, what)]
+        if [id for id, _ in expected] != [id for id, _ in actual]:
+            return Divergence(tick, f"{what} standing", [id for id, _ in expected], [id for id, _ in actual])
+        for (id, health), (_, other_health) in zip(expected, actual):
+            if abs(health - other_health) > health_tolerance:
+                return Divergence(tick, f"{what}[id={id}].health", health, other_health)
+
+    for what in ("player_troops", "enemy_troops"):
+        expected = getattr(reference, what)
+        actual = getattr(candidate, what)
+        if [troop.uid for troop in expected] != [troop.uid for troop in actual]:
+            missing = sorted({troop.uid for troop in expected} ^ {troop.uid for troop in actual})
+            return Divergence(tick, f"{what} alive (uids differing: {missing[:10]})", len(expected), len(actual))
+        for troop, other in zip(expected, actual):
+            if abs(troop.x - other.x) > position_tolerance or abs(troop.y - other.y) > position_tolerance:
+                return Divergence(tick, f"{what}[uid={troop.uid}] position", (troop.x, troop.y), (other.x, other.y))
+            if abs(troop.health - other.health) > health_tolerance:
+                return Divergence(tick, f"{what}[uid={troop.uid}].health", troop.health, other.health)
+    return None
+
+
+def aggregates(state):
+    """Per side totals a player would notice: kills, money and the health of standing structures."""
+    return {
+        "player_kills": state.player_kills,
+        "enemy_kills": state.enemy_kills,
+        "player_money": state.player_money,
+        "enemy_money": state.enemy_money,
+        "player_structures": sum(tower.health for tower in state.player_towers),
+        "enemy_structures": sum(tower.health for tower in state.enemy_towers),
+    }
+
+
+def compare_aggregates(reference, candidate, tolerance):
+    """Return the first Divergence between two states' aggregates beyond a Tolerance, or None."""
+    expected = aggregates(reference)
+    actual = aggregates(candidate)
+    for what, value in expected.items():
+        absolute, fraction = getattr(tolerance, what.split("_", 1)[1])
+        if abs(actual[what] - value) > absolute + fraction * abs(value):
+            return Divergence(reference.tick, what, value, actual[what])
+    return None
+
+
+def run_differential(scenario, backend, exact=None, position_tolerance=HARNESS_POSITION_TOLERANCE,
+                     health_tolerance=HARNESS_HEALTH_TOLERANCE, window=HARNESS_WINDOW):
+    """
+    Run a scenario through the reference and a candidate backend in lockstep.
+    - exact: Compare troop by troop every tick (True) or by aggregates (False). Defaults to the
+      backend's profile (see PROFILES).
+    Returns (first Divergence or None, ticks compared).
+    """
+    tolerance = PROFILES.get(backend)
+    if exact is None:
+        exact = tolerance is None
+    reference = new_state("reference", scenario)
+    candidate = new_state(backend, scenario)
+    if exact:
+        for _ in range(scenario.ticks):
+            advance(reference, scenario)
+            advance(candidate, scenario)
+            divergence = compare(reference, candidate, position_tolerance, health_tolerance)
+            if divergence:
+                return divergence, reference.tick
+            if reference.outcome:
+                break
+        return None, reference.tick
+
+    # Each state stops at its own outcome. Once one has finished the other gets up to one more
+    # window (past the scenario's end if need be) to reach the same outcome a little later.
+    finished_at = None
+    tick = 0
+    while True:
+        tick += 1
+        for state in (reference, candidate):
+            if state.outcome is None and (state.tick < scenario.ticks or finished_at is not None):
+                advance(state, scenario)
+        if reference.outcome and candidate.outcome:
+            break
+        if finished_at is None:
+            if reference.outcome or candidate.outcome:
+                finished_at = tick
+            elif tick >= scenario.ticks:
+                return compare_aggregates(reference, candidate, tolerance), tick
+            elif tick % window == 0:
+                divergence = compare_aggregates(reference, candidate, tolerance)
+                if divergence:
+                    return divergence, tick
+        elif tick - finished_at >= window:
+            break
+
+    # Totals jump as a base falls, so once a match has ended only the winner is compared
+    if reference.outcome == candidate.outcome:
+        return None, tick
+    if tolerance.winner == "not_reversed" and None in (reference.outcome, candidate.outcome):
+        return None, tick
+    return Divergence(tick, "outcome", reference.outcome, candidate.outcome), tick
+
+
+def stress(backend, target_tps=SIMULATION_TICK_RATE, start=50, ticks=120, seed=0, limit=50000):
+    """
+    Find how many troops a backend can simulate at the target tick rate.
+    Troops per side double each round until a round runs below target_tps (or limit is reached).
+    Returns [(troops per side, ticks per second), ...].
+    """
+    results = []
+    count = start
+    while count <= limit:
+        rng = random.Random(seed)
+        scenario = Scenario("stress", seed, ticks, (0, 0), {})
+        state = new_state(backend, scenario)
+        for side in (0, 1):
+            top, bottom = (MAP_HEIGHT / 2, MAP_HEIGHT - 50) if side == 0 else (50, MAP_HEIGHT / 2)
+            for _ in range(count):
+                state.spawn_troop(side, rng.uniform(10, MAP_WIDTH - 10), rng.uniform(top, bottom))
+
+        start_time = time.perf_counter()
+        for _ in range(ticks):
+            state.step()
+            if state.outcome:
+                break
+        tps = state.tick / (time.perf_counter() - start_time)
+        results.append((count, tps))
+        print(f"{backend}: {count} troops per side -> {tps:.1f} ticks/s")
+        if tps < target_tps:
+            break
+        count *= 2
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check fast simulation paths against the reference simulation.")
+    parser.add_argument("--backend", action="append", choices=[name for name in BACKENDS if name != "reference"],
+                        help="Backend to check (repeatable, default: all)")
+    parser.add_argument("--kind", action="append", choices=SCENARIO_KINDS, help="Scenario kind (repeatable, default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="First scenario seed")
+    parser.add_argument("--seeds", type=int, default=5, help="Scenarios per kind")
+    parser.add_argument("--ticks", type=int, default=HARNESS_TICKS)
+    parser.add_argument("--exact", action="store_true",
+                        help="Compare every backend troop by troop each tick, whatever its profile")
+    parser.add_argument("--position-tolerance", type=float, default=HARNESS_POSITION_TOLERANCE)
+    parser.add_argument("--health-tolerance", type=float, default=HARNESS_HEALTH_TOLERANCE)
+    parser.add_argument("--stress", action="store_true", help="Measure throughput instead of comparing")
+    parser.add_argument("--target-tps", type=float, default=SIMULATION_TICK_RATE,
+                        help="Stress mode: ticks per second a backend must sustain")
+    args = parser.parse_args(argv)
+
+    backends = args.backend or [name for name in BACKENDS if name != "reference"]
+    if args.stress:
+        for backend in ["reference"] + backends:
+            results = stress(backend, args.target_tps, seed=args.seed)
+            sustained = [count for count, tps in results if tps >= args.target_tps]
+            print(f"{backend}: sustains {max(sustained) if sustained else 0} troops per side at {args.target_tps:g} ticks/s")
+        return 0
+
+    failures = 0
+    for kind in args.kind or SCENARIO_KINDS:
+        for seed in range(args.seed, args.seed + args.seeds):
+            scenario = make_scenario(kind, seed, args.ticks)
+            for backend in backends:
+                exact = args.exact or PROFILES.get(backend) is None
+                profile = "exact" if exact else "aggregate"
+                divergence, ticks = run_differential(
+                    scenario, backend, exact, args.position_tolerance, args.health_tolerance
+                )
+                if divergence:
+                    failures += 1
+                    print(f"FAIL {kind} seed={seed} {backend} ({profile}): tick {divergence.tick}, {divergence.what}: "
+                          f"reference {divergence.reference!r}, {backend} {divergence.candidate!r}")
+                else:
+                    print(f"ok   {kind} seed={seed} {backend} ({profile}): {ticks} ticks")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import argparse
+import heapq
+import itertools
+import random
+import time
+import traceback
+from collections import deque
+
+from settings import SIMULATION_TICK_RATE, HOST_CPU_BUDGET, HOST_MAX_CATCH_UP, HOST_STATS_SECONDS
+from game.state import GameState
+
+
+class Match:
+    def __init__(self, id, state, controller=None, tick_rate=SIMULATION_TICK_RATE, stats_seconds=HOST_STATS_SECONDS):
+        """
+        One hosted match: an isolated GameState plus its scheduling and timing stats.
+        - controller: Optional callable(state) returning the tick's inputs, [(side, [upgrade key, ...]), ...].
+        - tick_rate: Ticks per second this match should run at.
+        """
+        self.id = id
+        self.state = state
+        self.controller = controller
+        self.period = 1.0 / tick_rate
+        self.next_due = None  # perf_counter time the next tick is due; set by MatchHost.add
+        self.started = None  # perf_counter time the match was added
+        self.start_tick = state.tick
+        self.late_ticks = 0  # Ticks dropped because the host could not catch up
+        self.error = None  # Exception that stopped the match, if one did
+        self.step_seconds = 0.0  # Total time spent stepping
+        self.max_step_seconds = 0.0
+        self._tick_times = deque(maxlen=max(2, int(tick_rate * stats_seconds)))
+
+    @property
+    def outcome(self):
+        """The match's outcome, "error" if stepping it raised, or None while it runs."""
+        return "error" if self.error is not None else self.state.outcome
+
+    @property
+    def finished(self):
+        return self.outcome is not None
+
+    @property
+    def virtual_due(self):
+        """When the next tick would be due had no ticks been dropped: lower means less progress for its age."""
+        return self.started + (self.state.tick - self.start_tick + 1) * self.period
+
+    def step(self):
+        """Advance the match one tick. Returns the seconds it took."""
+        start = time.perf_counter()
+        inputs = self.controller(self.state) if self.controller else ()
+        self.state.step(inputs)
+        end = time.perf_counter()
+        elapsed = end - start
+        self.step_seconds += elapsed
+        self.max_step_seconds = max(self.max_step_seconds, elapsed)
+        self._tick_times.append(end)
+        return elapsed
+
+    def tick_rate(self):
+        """Ticks per second achieved over the last stats_seconds."""
+        if len(self._tick_times) < 2:
+            return 0.0
+        return (len(self._tick_times) - 1) / (self._tick_times[-1] - self._tick_times[0])
+
+    def stats(self):
+        ticks = self.state.tick
+        return {
+            "id": self.id,
+            "tick": ticks,
+            "tick_rate": self.tick_rate(),
+            "mean_step_ms": self.step_seconds / ticks * 1000 if ticks else 0.0,
+            "max_step_ms": self.max_step_seconds * 1000,
+            "late_ticks": self.late_ticks,
+            "outcome": self.outcome,
+            "error": repr(self.error) if self.error is not None else None,
+        }
+
+
+class MatchHost:
+    def __init__(self, tick_rate=SIMULATION_TICK_RATE, cpu_budget=HOST_CPU_BUDGET, max_catch_up=HOST_MAX_CATCH_UP):
+        """
+        Runs many matches in one process, interleaving their ticks on the calling thread.
+        - tick_rate: Host cycles per second (and the default tick rate of new matches).
+        - cpu_budget: Fraction of each cycle that may be spent stepping matches; the rest is
+          headroom for networking and other work, so latency stays predictable under load.
+        - max_catch_up: Most ticks a match that fell behind may be stepped in one cycle, and the most
+          it may owe. A match further behind drops the extra ticks (counted as late_ticks) so it
+          neither starves the others nor bursts through a long backlog once load drops.
+        Due matches run least progressed first (by virtual_due, which ignores dropped ticks), so
+        when the budget runs out every match slows down evenly instead of some falling behind.
+        A match whose step raises is moved to finished with outcome "error"; the others keep running.
+        Matches share the read-only data in the process: the upgrade table and initial flow fields.
+        """
+        self.tick_rate = tick_rate
+        self.cpu_budget = cpu_budget
+        self.max_catch_up = max_catch_up
+        self.matches = {}
+        self.finished = {}
+        self._ids = itertools.count()
+        self.cycles = 0
+        self.over_budget_cycles = 0  # Cycles that ended with due ticks left unstepped
+        self.backlog = 0  # Due ticks the last cycle left unstepped
+
+    def add(self, state=None, controller=None, tick_rate=None):
+        """Host a match (a new GameState unless one is given). Returns the Match."""
+        match = Match(next(self._ids), state or GameState(), controller, tick_rate or self.tick_rate)
+        match.started = time.perf_counter()
+        match.next_due = match.started + match.period
+        self.matches[match.id] = match
+        return match
+
+    def remove(self, match_id):
+        """Stop hosting a match. Returns the Match, or None if it isn't hosted."""
+        return self.matches.pop(match_id, None)
+
+    def run_cycle(self):
+        """
+        Step every match that is due, earliest deadline first, within this cycle's budget.
+        Returns the seconds spent stepping.
+        """
+        self.cycles += 1
+        now = time.perf_counter()
+        budget = self.cpu_budget / self.tick_rate
+        spent = 0.0
+
+        for match in self.matches.values():
+            owed = int((now - match.next_due) / match.period)  # Overdue ticks beyond the one due now
+            if owed > self.max_catch_up:
+                match.late_ticks += owed - self.max_catch_up
+                match.next_due += (owed - self.max_catch_up) * match.period
+
+        due = [(match.virtual_due, match.id) for match in self.matches.values() if match.next_due <= now]
+        heapq.heapify(due)
+        stepped = dict.fromkeys(self.matches, 0)
+        while due and spent < budget:
+            _, match_id = heapq.heappop(due)
+            match = self.matches[match_id]
+            try:
+                spent += match.step()
+            except Exception as e:
+                match.error = e
+                print(f"Match {match_id} stopped at tick {match.state.tick} by an error:")
+                traceback.print_exc()
+            stepped[match_id] += 1
+
+            if match.finished:
+                self.finished[match_id] = self.matches.pop(match_id)
+                continue
+            match.next_due += match.period
+            if match.next_due <= now and stepped[match_id] < self.max_catch_up:
+                heapq.heappush(due, (match.virtual_due, match_id))
+
+        self.backlog = len(due)
+        if due:
+            self.over_budget_cycles += 1
+        return spent
+
+    def run(self, seconds=None):
+        """Run cycles until every match has finished (or for the given number of seconds)."""
+        end = time.perf_counter() + seconds if seconds is not None else None
+        while self.matches and (end is None or time.perf_counter() < end):
+            cycle_start = time.perf_counter()
+            self.run_cycle()
+            if not self.matches:
+                break
+            next_cycle = min(match.next_due for match in self.matches.values())
+            if self.backlog:
+                # Out of budget: keep the rest of the cycle free even though ticks are waiting
+                next_cycle = max(next_cycle, cycle_start + 1.0 / self.tick_rate)
+            wait = next_cycle - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+    def stats(self):
+        """Per-match stats for hosted and finished matches, ordered by match id."""
+        matches = sorted(list(self.matches.values()) + list(self.finished.values()), key=lambda match: match.id)
+        return [match.stats() for match in matches]
+
+
+def random_upgrades(seed, chance=0.01):
+    """A controller for AI-vs-AI matches: each side buys a random upgrade now and then."""
+    rng = random.Random(seed)
+
+    def controller(state):
+        return [
+            (side, [(rng.randrange(4), rng.randrange(3))] if rng.random() < chance else [])
+            for side in (0, 1)
+        ]
+
+    return controller
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many AI-vs-AI matches in one process.")
+    parser.add_argument("--matches", type=int, default=24)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--cpu-budget", type=float, default=HOST_CPU_BUDGET)
+    args = parser.parse_args(argv)
+
+    host = MatchHost(cpu_budget=args.cpu_budget)
+    for seed in range(args.matches):
+        host.add(GameState(enemy_upgradeable=True), random_upgrades(seed))
+    host.run(args.seconds)
+
+    for stats in host.stats():
+        print(
+            f"match {stats['id']:3}: tick {stats['tick']:6}, {stats['tick_rate']:5.1f} ticks/s, "
+            f"step {stats['mean_step_ms']:.2f} ms mean / {stats['max_step_ms']:.2f} ms max, "
+            f"{stats['late_ticks']} late ticks, {stats['error'] or stats['outcome'] or 'running'}"
+        )
+    print(f"{host.over_budget_cycles} of {host.cycles} cycles ran out of budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import gc
+import sys
+import tracemalloc
+import weakref
+from collections import defaultdict, deque
+
+
+def instance_bytes(obj):
+    """Shallow size of an object plus its attribute dict and any containers stored directly in it."""
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        for value in attributes.values():
+            if isinstance(value, (list, dict, set, tuple, weakref.WeakSet)):
+                size += sys.getsizeof(value)
+    return size
+
+
+def trend(samples):
+    """Least-squares slope of [(tick, value), ...] in value per tick (0 with fewer than two samples)."""
+    n = len(samples)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in samples)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in samples) / variance
+
+
+class MemoryMonitor:
+    def __init__(self, entity_types, caches=None, window=20, growth_threshold=0.2, frames=1, top=5):
+        """
+        Opt-in memory accounting for long matches.
+        - entity_types: Classes to count and size (e.g. Troop, Tower). Every live instance in the
+          process is counted, so instances that left the match but are still referenced show up.
+        - caches: {name: callable returning the current size} for caches and queues to watch.
+        - window: Samples kept per series for trend detection.
+        - growth_threshold: Flag a series that grew by this fraction across the window while its
+          fitted trend is still rising.
+        - frames: Stack depth recorded by tracemalloc (more is slower but finer grained).
+        - top: Source lines to list in reports of where traced memory grew.
+        tracemalloc is started on construction and stopped by close().
+        """
+        self.entity_types = tuple(entity_types)
+        self.caches = dict(caches or {})
+        self.window = window
+        self.growth_threshold = growth_threshold
+        self.top = top
+        self.history = defaultdict(lambda: deque(maxlen=window))  # series name -> (tick, value)
+        self.last_sample = {}
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(frames)
+        self._baseline = tracemalloc.take_snapshot()
+        self._latest = self._baseline
+
+    def sample(self, tick, tracked=None):
+        """
+        Record one sample.
+        - tick: Simulation tick, used as the time axis for trends.
+        - tracked: Optional {name: number of entities the match itself still holds}, e.g. troops in
+          the troop lists. The difference from the live count is reported as "detached".
+        Returns the sample as {series name: value}.
+        """
+        values = {}
+        counts = dict.fromkeys(self.entity_types, 0)
+        sizes = dict.fromkeys(self.entity_types, 0)
+        for obj in gc.get_objects():
+            cls = type(obj)
+            for entity_type in self.entity_types:
+                if issubclass(cls, entity_type):
+                    counts[entity_type] += 1
+                    sizes[entity_type] += instance_bytes(obj)
+                    break
+        for entity_type in self.entity_types:
+            name = entity_type.__name__
+            values[f"{name} live"] = counts[entity_type]
+            values[f"{name} bytes"] = sizes[entity_type]
+        for name, count in (tracked or {}).items():
+            values[f"{name} detached"] = values.get(f"{name} live", count) - count
+        for name, size in self.caches.items():
+            values[f"cache {name}"] = size()
+
+        self._latest = tracemalloc.take_snapshot()
+        values["traced bytes"] = tracemalloc.get_traced_memory()[0]
+
+        for name, value in values.items():
+            self.history[name].append((tick, value))
+        self.last_sample = values
+        return values
+
+    def growing(self):
+        """Return [(series name, first value, last value)] for series that keep growing across the window."""
+        flagged = []
+        for name, samples in self.history.items():
+            if len(samples) < self.window:
+                continue  # Not enough history to call it a trend
+            first, last = samples[0][1], samples[-1][1]
+            if last > first * (1 + self.growth_threshold) and trend(samples) > 0:
+                flagged.append((name, first, last))
+        return flagged
+
+    def report(self):
+        """Human-readable lines for the latest sample, growing series and top allocation growth."""
+        lines = [f"{name}: {value:,}" for name, value in self.last_sample.items()]
+        for name, first, last in self.growing():
+            lines.append(f"GROWING {name}: {first:,} -> {last:,} over the last {self.window} samples")
+        if self.top:
+            lines.append("Largest growth since start:")
+            for stat in self._latest.compare_to(self._baseline, "lineno")[:self.top]:
+                lines.append(f"  {stat}")
+        return lines
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
@@ -0,0 +1,199 @@
+import asyncio
+import struct
+import threading
+
+# Wire format (network byte order). Only per-tick inputs are sent, never game state,
+# so bandwidth is a few bytes per tick no matter how many troops are alive.
+MSG_START = 1  # server -> client: side assigned to the client, number of players
+MSG_INPUTS = 2  # client -> server -> other clients: one side's inputs for one tick
+
+START_FORMAT = struct.Struct("!BBB")  # type, side, players
+INPUTS_HEADER = struct.Struct("!BBIB")  # type, side, tick, input count
+INPUT_FORMAT = struct.Struct("!BB")  # entity index, upgrade index (see UpgradeSystem.upgrade_key)
+
+
+def encode_inputs(side, tick, inputs):
+    """Pack one side's upgrade purchases for a tick into bytes."""
+    data = bytearray(INPUTS_HEADER.pack(MSG_INPUTS, side, tick, len(inputs)))
+    for entity_index, upgrade_index in inputs:
+        data += INPUT_FORMAT.pack(entity_index, upgrade_index)
+    return bytes(data)
+
+
+async def read_inputs(reader):
+    """Read one MSG_INPUTS frame. Returns (side, tick, inputs)."""
+    _, side, tick, count = INPUTS_HEADER.unpack(await reader.readexactly(INPUTS_HEADER.size))
+    body = await reader.readexactly(INPUT_FORMAT.size * count)
+    inputs = [INPUT_FORMAT.unpack_from(body, i * INPUT_FORMAT.size) for i in range(count)]
+    return side, tick, inputs
+
+
+class LockstepServer:
+    def __init__(self, host="127.0.0.1", port=50007, players=2):
+        """
+        Relay server for a lockstep match.
+        - Waits for all players, tells each one its side, then forwards every
+          client's input frames to the other clients unchanged.
+        - It never simulates anything, so it can run on one of the players' machines.
+        """
+        self.host = host
+        self.port = port
+        self.players = players
+        self._writers = []
+        self._ready = None
+        self._server = None
+        self._loop = None
+
+    async def serve(self, listening=None):
+        """
+        Accept players and relay their inputs until the server is closed.
+        - listening: Optional threading.Event set once the socket is bound.
+        """
+        self._ready = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        if listening:
+            listening.set()
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # close() was called
+
+    async def _handle_client(self, reader, writer):
+        if len(self._writers) >= self.players:
+            writer.close()  # Match is full
+            return
+
+        side = len(self._writers)
+        self._writers.append(writer)
+        if len(self._writers) == self.players:
+            for player_side, player_writer in enumerate(self._writers):
+                player_writer.write(START_FORMAT.pack(MSG_START, player_side, self.players))
+            self._ready.set()
+        await self._ready.wait()
+
+        try:
+            while True:
+                frame_side, tick, inputs = await read_inputs(reader)
+                frame = encode_inputs(frame_side, tick, inputs)
+                for other in self._writers:
+                    if other is not writer:
+                        other.write(frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # A player left; drop everyone so the remaining clients stop stalling forever
+            for other in self._writers:
+                other.close()
+
+    def start(self):
+        """Run the server on its own event loop in a background thread. Returns self once listening."""
+        self._loop = asyncio.new_event_loop()
+        listening = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.serve(listening))
+
+        threading.Thread(target=run, name="lockstep-server", daemon=True).start()
+        listening.wait()
+        return self
+
+    def close(self):
+        """Stop accepting and relaying."""
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def start_loopback_server(port, players=2):
+    """
+    Run a LockstepServer on 127.0.0.1 inside this process, so a match can be
+    played (or tested) with every client on one machine.
+    """
+    return LockstepServer("127.0.0.1", port, players).start()
+
+
+class LockstepSession:
+    def __init__(self, host, port, input_delay):
+        """
+        A player's connection to a LockstepServer.
+        - Local inputs are sent for tick + input_delay, which hides the network round trip.
+        - A tick may only be simulated once every side's inputs for it have arrived;
+          until then the caller stalls (no rollback).
+        - The asyncio transport runs on a background thread so the game loop never blocks on it.
+        """
+        self.host = host
+        self.port = port
+        self.input_delay = input_delay
+        self.side = None
+        self.players = None
+        self.closed = False
+        self._inputs = {}  # tick -> {side: inputs}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._writer = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lockstep-client", daemon=True)
+
+    def connect(self, timeout=None):
+        """
+        Connect and wait until the server has assigned our side and all players joined.
+        The first input_delay ticks have no inputs from anyone, so they are pre-filled.
+        Returns True once the match can start.
+        """
+        self._thread.start()
+        if not self._started.wait(timeout) or self.closed:
+            return False
+        for tick in range(1, self.input_delay + 1):
+            for side in range(self.players):
+                self._store(side, tick, [])
+        return True
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._receive())
+        except (OSError, asyncio.IncompleteReadError, ConnectionError) as e:
+            if not self.closed:  # Not our own close()
+                print(f"Lockstep connection closed: {e}")
+        finally:
+            self.closed = True
+            self._started.set()  # Unblock connect() if we never got started
+
+    async def _receive(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        _, self.side, self.players = START_FORMAT.unpack(await reader.readexactly(START_FORMAT.size))
+        self._started.set()
+        while True:
+            side, tick, inputs = await read_inputs(reader)
+            self._store(side, tick, inputs)
+
+    def _store(self, side, tick, inputs):
+        with self._lock:
+            self._inputs.setdefault(tick, {})[side] = inputs
+
+    def send_inputs(self, tick, inputs):
+        """
+        Submit our inputs for the tick being simulated now. They take effect input_delay ticks later.
+        Must be called exactly once per simulated tick, even with no inputs.
+        """
+        target_tick = tick + self.input_delay
+        self._store(self.side, target_tick, list(inputs))
+        frame = encode_inputs(self.side, target_tick, inputs)
+        self._loop.call_soon_threadsafe(self._writer.write, frame)
+
+    def inputs_for(self, tick):
+        """
+        Return [(side, inputs), ...] for a tick in side order, or None if some side's inputs
+        have not arrived yet and the simulation has to stall.
+        """
+        with self._lock:
+            sides = self._inputs.get(tick)
+            if sides is None or len(sides) < self.players:
+                return None
+            del self._inputs[tick]
+        return sorted(sides.items())
+
+    def close(self):
+        """Drop the connection."""
+        if self._writer:
+            self._loop.call_soon_threadsafe(self._writer.close)
+        self.closed = True
@@ -0,0 +1,80 @@
+# Degradation levels, cheapest to give up first. Each level includes all the ones before it.
+LEVELS = (
+    "full",
+    "no_troop_health_bars",  # Troops are drawn without their health bars
+    "crowd_lod",  # Crowds merge into cluster glyphs much sooner
+    "reduced_render_rate",  # Only one frame in QUALITY_RENDER_DIVISOR is drawn; the simulation keeps its tick rate
+    "fewer_voices",  # Fewer mixer channels, so fewer sounds overlap
+    "coarse_separation",  # Troops separate from allies every few ticks (changes the simulation)
+)
+
+
+class QualityGovernor:
+    def __init__(self, frame_budget, degrade_frames=30, recover_frames=180, recover_ratio=0.5,
+                 smoothing=0.1, max_level=len(LEVELS) - 1):
+        """
+        Steps through LEVELS to keep frames within budget.
+        - frame_budget: Seconds of work allowed per frame (1 / FPS).
+        - degrade_frames: Consecutive frames over budget before dropping a level.
+        - recover_frames: Consecutive frames under recover_ratio * budget before going back up a level.
+          Stepping up adds back work, so recovery needs much more headroom than degrading (hysteresis).
+        - smoothing: Weight of the newest frame in the moving average.
+        - max_level: Deepest level allowed (e.g. stop before simulation changes in lockstep play).
+        If a level is degraded again shortly after recovering from it, the wait before the next
+        recovery attempt doubles, so a borderline load settles instead of flapping.
+        """
+        self.frame_budget = frame_budget
+        self.degrade_frames = degrade_frames
+        self.recover_ratio = recover_ratio
+        self.smoothing = smoothing
+        self.max_level = max_level
+        self.level = 0
+        self.average = 0.0  # Smoothed frame time in seconds
+        self._recover_frames = [recover_frames] * len(LEVELS)  # Frames needed to leave each level upwards
+        self._max_recover_frames = recover_frames * 16
+        self._over = 0  # Consecutive frames over budget
+        self._under = 0  # Consecutive frames with headroom
+        self._recovered_from = None  # Level the last recovery left
+        self._frames_since_recovery = 0
+
+    def update(self, frame_seconds):
+        """Feed the work time of the last frame. Returns True if the level changed."""
+        self.average += (frame_seconds - self.average) * self.smoothing
+        self._frames_since_recovery += 1
+
+        if self.average > self.frame_budget:
+            self._over += 1
+            self._under = 0
+        elif self.average < self.frame_budget * self.recover_ratio:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.degrade_frames and self.level < self.max_level:
+            recovered_recently = (
+                self._recovered_from == self.level + 1
+                and self._frames_since_recovery < self._recover_frames[self.level + 1]
+            )
+            self._set_level(self.level + 1)
+            if recovered_recently:
+                self._recover_frames[self.level] = min(self._max_recover_frames, self._recover_frames[self.level] * 2)
+            return True
+        if self._under >= self._recover_frames[self.level] and self.level > 0:
+            self._recovered_from = self.level
+            self._frames_since_recovery = 0
+            self._set_level(self.level - 1)
+            return True
+        return False
+
+    def _set_level(self, level):
+        self.level = level
+        self._over = self._under = 0
+
+    def at_least(self, name):
+        """Whether the degradation called name (see LEVELS) is active."""
+        return self.level >= LEVELS.index(name)
+
+    @property
+    def name(self):
+        return LEVELS[self.level]
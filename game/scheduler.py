@@ -0,0 +1,94 @@
+import heapq
+import itertools
+
+
+def ms_to_ticks(milliseconds, tick_rate):
+    """Convert a duration in milliseconds to a whole number of simulation ticks (at least one)."""
+    return max(1, round(milliseconds * tick_rate / 1000))
+
+
+class ScheduledEvent:
+    __slots__ = ("tick", "callback", "cancelled", "scheduler")
+
+    def __init__(self, tick, callback):
+        """
+        A callback waiting in the Scheduler.
+        - tick: Simulation tick the callback is due on.
+        - callback: Function called with no arguments when the event fires.
+        """
+        self.tick = tick
+        self.callback = callback
+        self.cancelled = False
+        self.scheduler = None  # Set while the event is queued
+
+    def cancel(self):
+        """Prevent the event from firing. It is discarded lazily when it reaches the front of the queue."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self.scheduler is not None:
+            self.scheduler._event_cancelled()
+
+
+class Scheduler:
+    def __init__(self):
+        """
+        Priority queue of timed events keyed on simulation ticks.
+        - Each tick only the events that are due are popped, so the cost of a tick
+          grows with the number of events that fire, not with the number of entities.
+        - Cancelled events stay queued until they are due. Once they make up most of the queue it is
+          rebuilt without them, so frequent cancellation can't grow the queue or keep callbacks alive.
+        """
+        self.tick = 0  # The tick currently being simulated
+        self._queue = []  # Heap of (tick, sequence, ScheduledEvent)
+        self._sequence = itertools.count()  # Keeps events scheduled for the same tick in FIFO order
+        self._cancelled = 0  # Cancelled events still in the queue
+
+    def schedule(self, delay, callback):
+        """
+        Schedule a callback a number of ticks from now.
+        - delay: Ticks to wait; values below 1 fire on the next tick.
+        Returns the ScheduledEvent so the caller can cancel it.
+        """
+        return self.schedule_at(self.tick + max(1, delay), callback)
+
+    def schedule_at(self, tick, callback):
+        """Schedule a callback on an absolute tick. Returns the ScheduledEvent."""
+        event = ScheduledEvent(tick, callback)
+        event.scheduler = self
+        heapq.heappush(self._queue, (tick, next(self._sequence), event))
+        return event
+
+    def run(self, tick):
+        """
+        Advance to the given tick and fire every event due on or before it.
+        Events scheduled by callbacks are always in the future, so they wait for a later tick.
+        Returns the number of callbacks fired.
+        """
+        self.tick = tick
+        fired = 0
+        queue = self._queue
+        while queue and queue[0][0] <= tick:
+            event = heapq.heappop(queue)[2]
+            event.scheduler = None
+            if event.cancelled:
+                self._cancelled -= 1
+            else:
+                event.callback()
+                fired += 1
+        return fired
+
+    def _event_cancelled(self):
+        """Count a cancellation and rebuild the queue once cancelled events dominate it."""
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._queue):
+            for _, _, event in self._queue:
+                if event.cancelled:
+                    event.scheduler = None
+            self._queue = [entry for entry in self._queue if not entry[2].cancelled]
+            heapq.heapify(self._queue)
+            self._cancelled = 0
+
+    def __len__(self):
+        """Number of queued events, including cancelled ones not yet discarded."""
+        return len(self._queue)
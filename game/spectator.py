@@ -0,0 +1,324 @@
+import socket
+import struct
+
+# Binary state stream for spectators and dashboards.
+# Every frame starts with a header. Keyframes carry every entity; delta frames carry only
+# entities whose quantized state differs from the previous frame, plus the ids removed since it.
+# Troops that only moved a little (most of them, every tick) are sent as a MOVE: the gap to the
+# previous MOVE's uid as a varint and the position change as two signed bytes.
+# Frames are numbered, so a spectator that misses one notices the gap, ignores deltas until the
+# next keyframe and asks for one right away (any datagram to the server does).
+# Frames are split into chunks that each fit in one datagram.
+KEYFRAME = 1
+DELTA = 2
+
+HEADER = struct.Struct("!BIIii")  # frame type, sequence, tick, player money, enemy money
+CHUNK = struct.Struct("!IHH")  # frame sequence, chunk index, chunk count; the frame bytes follow
+COUNT = struct.Struct("!H")
+TOWER = struct.Struct("!BH")  # tower id, health * 10
+TROOP = struct.Struct("!IHHBB")  # uid, x * scale, y * scale, health fraction (0-255), flags
+MOVE = struct.Struct("!bb")  # x and y change in 1/scale world units, after the varint uid gap
+REMOVED = struct.Struct("!I")  # troop uid
+
+FLAG_ENEMY = 1
+
+
+def _clamp16(value):
+    return 0 if value < 0 else 65535 if value > 65535 else value
+
+
+def _write_varint(buffer, value):
+    """Append a non-negative int, 7 bits per byte, low bits first."""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data, offset):
+    """Read an int written by _write_varint. Returns (value, offset after it)."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class DeltaEncoder:
+    def __init__(self, keyframe_interval=30, position_scale=4):
+        """
+        Turns FrameSnapshots into compact binary frames.
+        - keyframe_interval: Ticks between full keyframes.
+        - position_scale: Positions are sent as uint16 in 1/position_scale world units.
+        """
+        self.keyframe_interval = keyframe_interval
+        self.position_scale = position_scale
+        self.sequence = 0  # Sequence number of the last encoded frame
+        self._previous_troops = {}  # uid -> quantized troop in the previous frame
+        self._previous_towers = {}  # id -> quantized health in the previous frame
+        self._last_keyframe_tick = None
+
+    def request_keyframe(self):
+        """Make the next encoded frame a keyframe (e.g. a spectator just joined or missed a frame)."""
+        self._last_keyframe_tick = None
+
+    def encode(self, snapshot):
+        """Encode a FrameSnapshot. Returns bytes."""
+        scale = self.position_scale
+        troops = {}
+        for troop in snapshot.troops:
+            troops[troop.uid] = (
+                _clamp16(int(troop.x * scale)),
+                _clamp16(int(troop.y * scale)),
+                max(0, min(255, int(troop.health * 255 / troop.max_health))),
+                FLAG_ENEMY if troop.is_enemy else 0,
+            )
+        towers = {tower.id: _clamp16(int(tower.health * 10)) for tower in snapshot.towers}
+
+        keyframe = (
+            self._last_keyframe_tick is None
+            or snapshot.tick - self._last_keyframe_tick >= self.keyframe_interval
+        )
+        moved = []
+        if keyframe:
+            self._last_keyframe_tick = snapshot.tick
+            changed_troops = troops.items()
+            changed_towers = towers.items()
+            removed = ()
+        else:
+            previous_troops = self._previous_troops
+            previous_towers = self._previous_towers
+            changed_troops = []
+            for uid, q in troops.items():
+                previous = previous_troops.get(uid)
+                if previous == q:
+                    continue
+                if previous is not None and previous[2:] == q[2:]:
+                    dx = q[0] - previous[0]
+                    dy = q[1] - previous[1]
+                    if -128 <= dx <= 127 and -128 <= dy <= 127:
+                        moved.append((uid, dx, dy))
+                        continue
+                changed_troops.append((uid, q))
+            changed_towers = [(id, q) for id, q in towers.items() if previous_towers.get(id) != q]
+            removed = [uid for uid in previous_troops if uid not in troops]
+            # Destroyed towers are sent with zero health
+            changed_towers += [(id, 0) for id in previous_towers if id not in towers]
+        self._previous_troops = troops
+        self._previous_towers = towers
+        self.sequence += 1
+
+        parts = [HEADER.pack(KEYFRAME if keyframe else DELTA, self.sequence, snapshot.tick,
+                             snapshot.player_money, snapshot.enemy_money)]
+        parts.append(COUNT.pack(len(changed_towers)))
+        parts.extend(TOWER.pack(id, health) for id, health in changed_towers)
+        parts.append(COUNT.pack(len(changed_troops)))
+        parts.extend(TROOP.pack(uid, *q) for uid, q in changed_troops)
+        parts.append(COUNT.pack(len(moved)))
+        moves = bytearray()
+        last_uid = 0
+        for uid, dx, dy in sorted(moved):
+            _write_varint(moves, uid - last_uid)
+            moves += MOVE.pack(dx, dy)
+            last_uid = uid
+        parts.append(bytes(moves))
+        parts.append(COUNT.pack(len(removed)))
+        parts.extend(REMOVED.pack(uid) for uid in removed)
+        return b"".join(parts)
+
+
+class DeltaDecoder:
+    def __init__(self, position_scale=4):
+        """
+        Rebuilds game state from frames made by DeltaEncoder.
+        After apply(), read tick, player_money, enemy_money, towers ({id: health})
+        and troops ({uid: (x, y, health fraction 0-1, is_enemy)}).
+        needs_keyframe is set while deltas can't be applied (none received yet, or one was missed).
+        """
+        self.position_scale = position_scale
+        self.sequence = None  # Sequence number of the last applied frame
+        self.needs_keyframe = True
+        self.tick = None
+        self.player_money = 0
+        self.enemy_money = 0
+        self.towers = {}
+        self.troops = {}
+
+    def apply(self, data):
+        """
+        Decode one frame. Returns False if it was not applied: a frame older than the last one
+        applied, or a delta that doesn't follow it (which sets needs_keyframe).
+        """
+        frame_type, sequence, tick, player_money, enemy_money = HEADER.unpack_from(data, 0)
+        offset = HEADER.size
+        if self.sequence is not None and sequence <= self.sequence:
+            return False  # Late or duplicate
+        if frame_type == DELTA and (self.needs_keyframe or sequence != self.sequence + 1):
+            self.needs_keyframe = True  # Missed a frame: the delta is relative to state we don't have
+            return False
+
+        towers = {}
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            id, health = TOWER.unpack_from(data, offset)
+            offset += TOWER.size
+            towers[id] = health / 10
+
+        troops = {}
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        scale = self.position_scale
+        for _ in range(count):
+            uid, x, y, health, flags = TROOP.unpack_from(data, offset)
+            offset += TROOP.size
+            troops[uid] = (x / scale, y / scale, health / 255, bool(flags & FLAG_ENEMY))
+
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        uid = 0
+        previous_troops = self.troops
+        for _ in range(count):
+            gap, offset = _read_varint(data, offset)
+            uid += gap
+            dx, dy = MOVE.unpack_from(data, offset)
+            offset += MOVE.size
+            x, y, health, is_enemy = previous_troops[uid]
+            troops[uid] = ((round(x * scale) + dx) / scale, (round(y * scale) + dy) / scale, health, is_enemy)
+
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        removed = [REMOVED.unpack_from(data, offset + i * REMOVED.size)[0] for i in range(count)]
+
+        if frame_type == KEYFRAME:
+            self.towers = towers
+            self.troops = troops
+            self.needs_keyframe = False
+        else:
+            self.towers.update(towers)
+            self.troops.update(troops)
+            for uid in removed:
+                self.troops.pop(uid, None)
+        self.towers = {id: health for id, health in self.towers.items() if health > 0}
+
+        self.sequence = sequence
+        self.tick = tick
+        self.player_money = player_money
+        self.enemy_money = enemy_money
+        return True
+
+
+def split_frame(sequence, data, datagram_size):
+    """Split an encoded frame into datagrams of at most datagram_size bytes, each with a CHUNK header."""
+    payload = datagram_size - CHUNK.size
+    count = max(1, -(-len(data) // payload))
+    return [
+        CHUNK.pack(sequence, index, count) + data[index * payload:(index + 1) * payload]
+        for index in range(count)
+    ]
+
+
+class FrameAssembler:
+    def __init__(self):
+        """
+        Reassembles frames from the datagrams made by split_frame.
+        Only the newest frame is collected: once a later one starts arriving, the chunks of an
+        incomplete earlier frame are dropped and the decoder sees a gap.
+        """
+        self.sequence = None
+        self._chunks = {}
+
+    def add(self, datagram):
+        """Add one datagram. Returns the complete frame's bytes, or None while chunks are missing."""
+        sequence, index, count = CHUNK.unpack_from(datagram, 0)
+        if sequence != self.sequence:
+            if self.sequence is not None and sequence < self.sequence:
+                return None  # Chunk of a frame we already gave up on
+            self.sequence = sequence
+            self._chunks = {}
+        self._chunks[index] = datagram[CHUNK.size:]
+        if len(self._chunks) < count:
+            return None
+        data = b"".join(self._chunks[i] for i in range(count))
+        self._chunks = {}
+        return data
+
+
+class SpectatorServer:
+    def __init__(self, port, keyframe_interval=30, position_scale=4, host="127.0.0.1", datagram_size=1200):
+        """
+        Publishes the encoded state stream over UDP.
+        - Spectators subscribe by sending any datagram to the port; they then receive one
+          frame per published tick, split into datagrams of at most datagram_size bytes.
+        - Any datagram from a spectator (including the first) forces a keyframe, which is how
+          a spectator that missed a frame asks to resynchronize.
+        - Everything is non-blocking so it can be called from the simulation loop.
+        """
+        self.encoder = DeltaEncoder(keyframe_interval, position_scale)
+        self.datagram_size = datagram_size
+        self.subscribers = set()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind((host, port))
+
+    def publish(self, snapshot):
+        """Accept new subscribers and send them the encoded snapshot."""
+        self._accept()
+        if not self.subscribers:
+            return  # Nothing to do: don't even encode
+        data = self.encoder.encode(snapshot)
+        datagrams = split_frame(self.encoder.sequence, data, self.datagram_size)
+        for address in list(self.subscribers):
+            try:
+                for datagram in datagrams:
+                    self.sock.sendto(datagram, address)
+            except ConnectionError:
+                self.subscribers.discard(address)  # Spectator went away
+            except OSError:
+                pass  # e.g. send buffer full: the spectator sees a gap and asks for a keyframe
+
+    def _accept(self):
+        while True:
+            try:
+                _, address = self.sock.recvfrom(64)
+            except (BlockingIOError, ConnectionError):
+                return
+            self.subscribers.add(address)
+            self.encoder.request_keyframe()  # New spectator, or one that missed a frame
+
+    def close(self):
+        self.sock.close()
+
+
+def watch(host, port, position_scale=4):
+    """Minimal spectator: subscribe and print a one-line summary per frame."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.sendto(b"hello", (host, port))
+    assembler = FrameAssembler()
+    decoder = DeltaDecoder(position_scale)
+    while True:
+        datagram, _ = sock.recvfrom(65535)
+        data = assembler.add(datagram)
+        if data is None:
+            continue
+        if not decoder.apply(data):
+            if decoder.needs_keyframe:
+                sock.sendto(b"keyframe", (host, port))
+            continue
+        enemies = sum(1 for troop in decoder.troops.values() if troop[3])
+        print(
+            f"tick {decoder.tick}: {len(data)} bytes, "
+            f"{len(decoder.troops) - enemies} blue / {enemies} red troops, "
+            f"towers {decoder.towers}, money ${decoder.player_money} / ${decoder.enemy_money}"
+        )
+
+
+if __name__ == "__main__":
+    import sys
+    from settings import SPECTATOR_PORT, SPECTATOR_POSITION_SCALE
+
+    host = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    watch(host, int(sys.argv[2]) if len(sys.argv) > 2 else SPECTATOR_PORT, SPECTATOR_POSITION_SCALE)
@@ -0,0 +1,300 @@
+import functools
+import itertools
+import math
+import threading
+import time
+
+from settings import (
+    MONEY_INCREMENT, TOWER_SIZE, BASE_SIZE,
+    MAP_WIDTH, MAP_HEIGHT, LANE_COUNT, TOWERS_PER_LANE, LANE_TOWER_SPACING,
+    FLOW_FIELDS_ENABLED, FLOW_FIELD_CELL_SIZE,
+    AI_REACQUIRE_FRACTION, AI_REACQUIRE_BUDGET, AI_REACQUIRE_MAX_INTERVAL,
+)
+from game.entities import Tower, Base, Troop
+from game.flowfield import FlowField
+from game.game_loop import FrameSnapshot
+from game.scheduler import Scheduler
+from game.upgrades import UPGRADE_SYSTEM
+
+
+class GameState:
+    def __init__(self, enemy_upgradeable=False, telemetry=None,
+                 flow_fields=FLOW_FIELDS_ENABLED, staggered_targeting=True, separation_interval=1):
+        """
+        Holds all simulation state for one match.
+        - Towers, troops and money for both sides.
+        - The UpgradeSystem both sides (0 = player, 1 = enemy) buy from, shared by every match.
+        - A lock that must be held while the simulation or the UI mutates the state.
+        - enemy_upgradeable: Let upgrades apply to the enemy side (a second player controls it).
+        - telemetry: Optional TelemetryRecorder fed once per tick.
+        - flow_fields / staggered_targeting: Fast paths. With both off every troop scans for
+          targets and computes its heading every tick (the reference simulation, see game.harness).
+        - separation_interval: Ticks between each troop's ally separation check, with the push
+          scaled to match. Raised by the quality governor under load.
+        """
+        self.player_towers = self.build_towers(is_enemy=False)
+        self.enemy_towers = self.build_towers(is_enemy=True)
+        for tower in self.enemy_towers:
+            tower.upgradeable = enemy_upgradeable
+        for id, tower in enumerate(self.player_towers + self.enemy_towers):
+            tower.id = id
+        # Each side's structure ids in layout order; upgrades name their target by this position
+        self.structure_ids = ([tower.id for tower in self.player_towers], [tower.id for tower in self.enemy_towers])
+        self.enemy_upgradeable = enemy_upgradeable
+        self.player_troops = []
+        self.enemy_troops = []
+
+        self.player_money = 5000
+        self.enemy_money = 100
+        self.player_kills = 0  # Enemy troops killed by the player, over the whole match
+        self.enemy_kills = 0
+        self.telemetry = telemetry
+
+        self.tick = 0  # Number of simulation steps taken
+        self.staggered_targeting = staggered_targeting
+        self.reacquire_interval = 1  # Ticks between target scans for each troop
+        self.separation_interval = separation_interval
+        self.troop_uids = itertools.count()  # Per match, so runs with the same inputs get the same uids
+        self.outcome = None  # "victory" or "defeat" once a base falls
+        self.lock = threading.RLock()
+
+        # Spawns, attack phases and cooldowns fire from the scheduler only when due
+        self.scheduler = Scheduler()
+        for tower in self.player_towers:
+            tower.schedule_spawns(self.scheduler, self.player_troops, self.troop_uids)  # Player troops spawn from player towers
+        for tower in self.enemy_towers:
+            tower.schedule_spawns(self.scheduler, self.enemy_troops, self.troop_uids)  # Enemy troops spawn from enemy towers
+
+        self.upgrade_system = UPGRADE_SYSTEM
+
+        # Per-team steering grids: index 0 leads player troops to enemy structures, 1 the reverse
+        self.flow_fields = None
+        if flow_fields:
+            # Every match starts from the same layout, so the fields are built once per process and cloned
+            self.flow_fields = []
+            for side, targets in ((0, self.enemy_towers), (1, self.player_towers)):
+                template, template_targets = self.flow_field_template(side)
+                self.flow_fields.append(template.clone(dict(zip(template_targets, targets))))
+
+    @staticmethod
+    def build_towers(is_enemy):
+        """
+        Lay out one side's structures on the map.
+        - TOWERS_PER_LANE towers in each of LANE_COUNT lanes, spread across MAP_WIDTH.
+        - The base goes last, centered at the side's end of the map.
+        """
+        towers = []
+        lane_span = MAP_WIDTH - 100 - TOWER_SIZE
+        for lane in range(LANE_COUNT):
+            if LANE_COUNT > 1:
+                x = 50 + lane * lane_span // (LANE_COUNT - 1)
+            else:
+                x = MAP_WIDTH // 2 - TOWER_SIZE // 2
+            for i in range(TOWERS_PER_LANE):
+                if is_enemy:
+                    towers.append(Tower(x, 100 + i * LANE_TOWER_SPACING, is_enemy=True))
+                else:
+                    towers.append(Tower(x, MAP_HEIGHT - 150 - i * LANE_TOWER_SPACING))
+
+        if is_enemy:
+            towers.append(Base(MAP_WIDTH // 2 - BASE_SIZE // 4, 50, is_enemy=True))
+        else:
+            towers.append(Base(MAP_WIDTH // 2 - BASE_SIZE // 4, MAP_HEIGHT - BASE_SIZE))
+        return towers
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def flow_field_template(side):
+        """
+        The initial flow field for a side's troops, built once per process and never modified.
+        Returns (field, targets): targets are private structures laid out like build_towers,
+        in the same order, so a match maps them to its own structures before cloning.
+        """
+        targets = GameState.build_towers(is_enemy=side == 0)
+        field = FlowField(MAP_WIDTH, MAP_HEIGHT, FLOW_FIELD_CELL_SIZE)
+        field.build(targets)
+        return field, targets
+
+    def update_reacquire_interval(self):
+        """
+        Pick how many ticks apart each troop rescans for targets.
+        - Normally 1 / AI_REACQUIRE_FRACTION, so that fraction of troops scans each tick.
+        - Under load it stretches so at most AI_REACQUIRE_BUDGET troops scan per tick,
+          capped at AI_REACQUIRE_MAX_INTERVAL.
+        - Always 1 (every troop, every tick) with staggered_targeting off.
+        """
+        if not self.staggered_targeting:
+            self.reacquire_interval = 1
+            return 1
+        troop_count = len(self.player_troops) + len(self.enemy_troops)
+        interval = max(round(1 / AI_REACQUIRE_FRACTION), math.ceil(troop_count / AI_REACQUIRE_BUDGET))
+        self.reacquire_interval = max(1, min(interval, AI_REACQUIRE_MAX_INTERVAL))
+        return self.reacquire_interval
+
+    def spawn_troop(self, side, x, y):
+        """Add a troop for a side (0 = player, 1 = enemy) at a position, outside the towers' spawn schedule."""
+        is_enemy = side == 1
+        troop = Troop(x, y, -1 if is_enemy else 1, is_enemy, scheduler=self.scheduler, uid=next(self.troop_uids))
+        troop.upgradeable = self.enemy_upgradeable if is_enemy else True
+        (self.enemy_troops if is_enemy else self.player_troops).append(troop)
+        return troop
+
+    def structure(self, side, slot):
+        """
+        Look up one of a side's structures by its position in the original layout.
+        - slot: Index into the layout (0 = first tower, -1 = base), as upgrades name their target.
+        Returns the Tower, or None once it has been destroyed.
+        """
+        structure_id = self.structure_ids[side][slot]
+        towers = self.enemy_towers if side else self.player_towers
+        return next((tower for tower in towers if tower.id == structure_id), None)
+
+    def purchase(self, side, upgrade):
+        """Buy an upgrade for a side (0 = player, 1 = enemy) if it can afford it."""
+        if side == 0:
+            money = self.player_money
+            self.player_money = self.upgrade_system.apply_upgrade(upgrade, money, self, side)
+            bought = self.player_money != money
+        else:
+            money = self.enemy_money
+            self.enemy_money = self.upgrade_system.apply_upgrade(upgrade, money, self, side)
+            bought = self.enemy_money != money
+
+        if bought and self.telemetry:
+            self.telemetry.record_upgrade(self.tick, side, self.upgrade_system.find_key(upgrade))
+
+    def step(self, inputs=()):
+        """
+        Advance the simulation by one tick: apply inputs, spawn, move, resolve collisions and clean up.
+        - inputs: [(side, [upgrade key, ...]), ...] to apply at the start of the tick.
+          With identical inputs the step is deterministic, which lockstep play relies on.
+        """
+        self.tick += 1
+        for side, keys in inputs:
+            for key in keys:
+                upgrade = self.upgrade_system.upgrade_by_key(key)
+                if upgrade:
+                    self.purchase(side, upgrade)
+        self.scheduler.run(self.tick)  # Fire spawns, attack phase flips and cooldown expiries due this tick
+
+        # Each troop rescans for targets every reacquire_interval ticks, in staggered buckets
+        interval = self.update_reacquire_interval()
+        separation_interval = self.separation_interval
+        tick = self.tick
+
+        # Move player troops, checking for collisions with enemy troops and towers
+        for player_troop in self.player_troops:
+            player_troop.move(
+                allies=self.player_troops,
+                enemies=self.enemy_troops,
+                enemy_towers=self.enemy_towers,
+                flow_field=self.flow_fields[0] if self.flow_fields else None,
+                reacquire=(player_troop.uid + tick) % interval == 0,
+                separation=0 if (player_troop.uid + tick) % separation_interval else separation_interval
+            )
+
+        # Move enemy troops, checking for collisions with player troops and towers
+        for enemy_troop in self.enemy_troops:
+            enemy_troop.move(
+                allies=self.enemy_troops,
+                enemies=self.player_troops,
+                enemy_towers=self.player_towers,
+                flow_field=self.flow_fields[1] if self.flow_fields else None,
+                reacquire=(enemy_troop.uid + tick) % interval == 0,
+                separation=0 if (enemy_troop.uid + tick) % separation_interval else separation_interval
+            )
+
+        # Remove destroyed towers, updating only the flow field cells that led to them
+        if self.flow_fields:
+            for tower in self.enemy_towers:
+                if tower.health <= 0:
+                    self.flow_fields[0].remove_target(tower)
+            for tower in self.player_towers:
+                if tower.health <= 0:
+                    self.flow_fields[1].remove_target(tower)
+        self.enemy_towers = [tower for tower in self.enemy_towers if tower.health > 0]
+        self.player_towers = [tower for tower in self.player_towers if tower.health > 0]
+
+        # Example collision handling in game loop
+        for player_troop in self.player_troops:
+            player_collision = False  # Tracks if this player troop is colliding with any enemy
+            for enemy_troop in self.enemy_troops:
+                if player_troop.get_rect().colliderect(enemy_troop.get_rect()):
+                    player_collision = True
+
+                    # Reduce health
+                    player_troop.take_damage(enemy_troop.attack_power)
+                    enemy_troop.take_damage(player_troop.attack_power)
+
+                    # Stop movement and initiate attack
+                    player_troop.start_attack()
+                    enemy_troop.start_attack()
+
+            # Resume movement if no collisions occurred
+            if not player_collision:
+                player_troop.stop_attack()
+
+        for enemy_troop in self.enemy_troops:
+            enemy_collision = False  # Tracks if this enemy troop is colliding with any player
+            for player_troop in self.player_troops:
+                if enemy_troop.get_rect().colliderect(player_troop.get_rect()):
+                    enemy_collision = True
+
+            # Resume movement if no collisions occurred
+            if not enemy_collision:
+                enemy_troop.stop_attack()
+
+        # Update money based on dead troops
+        player_kills = len([troop for troop in self.enemy_troops if troop.health <= 0])
+        enemy_kills = len([troop for troop in self.player_troops if troop.health <= 0])
+        self.player_kills += player_kills
+        self.enemy_kills += enemy_kills
+        self.player_money += player_kills * MONEY_INCREMENT
+        self.enemy_money += enemy_kills * MONEY_INCREMENT
+
+        # Remove dead troops (in place: towers spawn into these lists). Troops that picked one after it
+        # died this tick drop it now, rather than chasing it for as long as something else references it.
+        for troop in itertools.chain(self.player_troops, self.enemy_troops):
+            if troop.health <= 0:
+                for attacker in list(troop.targeted_by):
+                    attacker.set_target(None)
+        self.player_troops[:] = [troop for troop in self.player_troops if troop.health > 0]
+        self.enemy_troops[:] = [troop for troop in self.enemy_troops if troop.health > 0]
+
+        # Victory condition
+        player_base = next((base for base in self.player_towers if isinstance(base, Base)), None)
+        enemy_base = next((base for base in self.enemy_towers if isinstance(base, Base)), None)
+
+        if enemy_base is None or enemy_base.health <= 0:
+            self.outcome = "victory"
+        elif player_base is None or player_base.health <= 0:
+            self.outcome = "defeat"
+
+        if self.telemetry:
+            self.telemetry.record(
+                self.tick, self.player_money, self.enemy_money, self.player_kills, self.enemy_kills,
+                len(self.player_troops), len(self.enemy_troops),
+                sum(tower.health for tower in self.player_towers),
+                sum(tower.health for tower in self.enemy_towers),
+            )
+
+    def snapshot(self):
+        """Capture an immutable FrameSnapshot of the current tick for the renderer."""
+        troops = tuple(troop.snapshot() for troop in self.player_troops + self.enemy_troops)
+        return FrameSnapshot(
+            tick=self.tick,
+            time=time.perf_counter(),
+            towers=tuple(tower.snapshot() for tower in self.player_towers + self.enemy_towers),
+            troops=troops,
+            troop_index={troop.uid: troop for troop in troops},
+            player_money=self.player_money,
+            enemy_money=self.enemy_money,
+        )
+
+    def step_and_snapshot(self, inputs=()):
+        """Simulation worker entry point. Returns None once the match is over."""
+        with self.lock:
+            if self.outcome:
+                return None
+            self.step(inputs)
+            return self.snapshot()
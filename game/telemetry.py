@@ -0,0 +1,137 @@
+import json
+import struct
+import sys
+from array import array
+
+MAGIC = b"BVRT"
+HEADER_LENGTH = struct.Struct("<I")
+
+# Per-tick counters: (name, array typecode). Counters are cumulative or instantaneous values,
+# so dropping every other row when downsampling never loses totals.
+COLUMNS = (
+    ("tick", "I"),
+    ("player_money", "i"),
+    ("enemy_money", "i"),
+    ("player_kills", "I"),  # Cumulative enemy troops killed (each worth MONEY_INCREMENT)
+    ("enemy_kills", "I"),
+    ("player_troops", "I"),
+    ("enemy_troops", "I"),
+    ("player_tower_health", "f"),  # Summed health of all living player structures
+    ("enemy_tower_health", "f"),
+)
+
+# Upgrade purchases, recorded individually and never downsampled
+EVENT_COLUMNS = (
+    ("tick", "I"),
+    ("side", "B"),
+    ("entity_index", "B"),  # See UpgradeSystem.upgrade_key
+    ("upgrade_index", "B"),
+)
+
+
+class TelemetryRecorder:
+    def __init__(self, capacity=36000):
+        """
+        Records match counters into preallocated typed arrays.
+        - capacity: Rows kept in memory. When full, every other row is dropped and the
+          sampling stride doubles, so long matches keep an evenly spaced history in fixed memory.
+        """
+        self.capacity = capacity
+        self.columns = {name: array(typecode, [0]) * capacity for name, typecode in COLUMNS}
+        self.events = {name: array(typecode) for name, typecode in EVENT_COLUMNS}
+        self.count = 0  # Rows in use
+        self.stride = 1  # Record every stride-th tick
+
+    def record(self, tick, player_money, enemy_money, player_kills, enemy_kills,
+               player_troops, enemy_troops, player_tower_health, enemy_tower_health):
+        """Record one tick of counters (skipped unless the tick falls on the current stride)."""
+        if tick % self.stride:
+            return
+        if self.count == self.capacity:
+            self._downsample()
+            if tick % self.stride:
+                return
+
+        i = self.count
+        columns = self.columns
+        columns["tick"][i] = tick
+        columns["player_money"][i] = player_money
+        columns["enemy_money"][i] = enemy_money
+        columns["player_kills"][i] = player_kills
+        columns["enemy_kills"][i] = enemy_kills
+        columns["player_troops"][i] = player_troops
+        columns["enemy_troops"][i] = enemy_troops
+        columns["player_tower_health"][i] = player_tower_health
+        columns["enemy_tower_health"][i] = enemy_tower_health
+        self.count = i + 1
+
+    def record_upgrade(self, tick, side, key):
+        """Record an upgrade purchase. key is (entity index, upgrade index)."""
+        events = self.events
+        events["tick"].append(tick)
+        events["side"].append(side)
+        events["entity_index"].append(key[0])
+        events["upgrade_index"].append(key[1])
+
+    def _downsample(self):
+        """Keep every other row (those on the doubled stride) and compact them to the front."""
+        self.stride *= 2
+        ticks = self.columns["tick"]
+        keep = [i for i in range(self.count) if ticks[i] % self.stride == 0]
+        for column in self.columns.values():
+            kept = array(column.typecode, (column[i] for i in keep))
+            column[:len(kept)] = kept
+        self.count = len(keep)
+
+    def export(self, path):
+        """
+        Write the recording as a columnar file:
+        magic, little-endian uint32 header length, JSON header, then each column's raw bytes.
+        """
+        header = {
+            "byteorder": sys.byteorder,
+            "stride": self.stride,
+            "columns": [[name, typecode, self.count] for name, typecode in COLUMNS],
+            "events": [[name, typecode, len(self.events[name])] for name, typecode in EVENT_COLUMNS],
+        }
+        header_bytes = json.dumps(header).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for name, _ in COLUMNS:
+                f.write(self.columns[name][:self.count].tobytes())
+            for name, _ in EVENT_COLUMNS:
+                f.write(self.events[name].tobytes())
+
+
+def load_telemetry(path):
+    """
+    Load a file written by TelemetryRecorder.export.
+    Returns (columns, events, stride) where columns and events map names to typed arrays.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+    (header_length,) = HEADER_LENGTH.unpack_from(data, 4)
+    offset = 4 + HEADER_LENGTH.size
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length
+
+    def read_columns(specs):
+        nonlocal offset
+        result = {}
+        for name, typecode, count in specs:
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(data[offset:offset + size])
+            if header["byteorder"] != sys.byteorder:
+                column.byteswap()
+            result[name] = column
+            offset += size
+        return result
+
+    columns = read_columns(header["columns"])
+    events = read_columns(header["events"])
+    return columns, events, header["stride"]
@@ -0,0 +1,183 @@
+import pygame
+
+from settings import WHITE, BLACK, GREEN, RED
+
+
+class Widget:
+    def __init__(self, rect):
+        """
+        A retained UI element.
+        - The element is rendered to a cached surface once and blitted every frame after that.
+        - Call invalidate() when its appearance changes; relayout() when its size/visibility changes.
+        """
+        self.rect = pygame.Rect(rect)
+        self.visible = True
+        self.root = None  # Set by UIRoot.add
+        self._surface = None
+
+    def invalidate(self):
+        """Re-render on the next draw."""
+        self._surface = None
+
+    def relayout(self):
+        """Re-render and rebuild the root's hit-test index (size, position or visibility changed)."""
+        self.invalidate()
+        if self.root:
+            self.root.invalidate_layout()
+
+    def render(self):
+        """Return a Surface the size of self.rect showing the widget."""
+        raise NotImplementedError
+
+    def draw(self, screen):
+        if self._surface is None:
+            self._surface = self.render()
+        screen.blit(self._surface, self.rect)
+
+
+class Button(Widget):
+    def __init__(self, x, y, width, height, text, callback, font=None, color=WHITE, text_color=BLACK):
+        super().__init__((x, y, width, height))
+        self.text = text
+        self.callback = callback
+        self.font = font or pygame.font.Font(None, 26)
+        self.color = color
+        self.text_color = text_color
+
+    def render(self):
+        surface = pygame.Surface(self.rect.size)
+        local = surface.get_rect()
+        pygame.draw.rect(surface, self.color, local)
+        pygame.draw.rect(surface, BLACK, local, 2)
+        text_surface = self.font.render(self.text, True, self.text_color)
+        surface.blit(text_surface, text_surface.get_rect(center=local.center))
+        return surface
+
+    def is_clicked(self, mouse_pos, mouse_pressed):
+        return self.rect.collidepoint(mouse_pos) and mouse_pressed[0]  # Left click
+
+
+class Label(Widget):
+    def __init__(self, x, y, text="", font=None, color=WHITE):
+        self.font = font or pygame.font.Font(None, 26)
+        self.color = color
+        self.text = text
+        super().__init__((x, y, 0, 0))
+        self.rect.size = self.font.size(text)
+
+    def set_text(self, text):
+        """Change the text; only re-renders when it actually differs."""
+        if text != self.text:
+            self.text = text
+            self.rect.size = self.font.size(text)
+            self.invalidate()
+
+    def render(self):
+        return self.font.render(self.text, True, self.color)
+
+
+class UpgradeMenu(Widget):
+    def __init__(self, x, y, width=200, font=None):
+        """
+        Upgrade options for the selected entity, one row per Upgrade.
+        Rows are green when affordable and red otherwise.
+        """
+        super().__init__((x, y, width, 20))
+        self.font = font or pygame.font.Font(None, 26)
+        self.upgrades = []
+        self.affordable = ()
+        self.visible = False
+        self._label_surfaces = []
+
+    def open(self, upgrades, money):
+        """Show the menu for a list of upgrades."""
+        self.upgrades = list(upgrades)
+        self.affordable = tuple(money >= upgrade.cost for upgrade in self.upgrades)
+        self._label_surfaces = [
+            self.font.render(f"{upgrade.name} (${upgrade.cost})", True, BLACK) for upgrade in self.upgrades
+        ]
+        self.rect.height = len(self.upgrades) * 40 + 20
+        self.visible = True
+        self.relayout()
+
+    def close(self):
+        self.visible = False
+        self.relayout()
+
+    def set_money(self, money):
+        """Update row colors; only re-renders when affordability of some row changed."""
+        affordable = tuple(money >= upgrade.cost for upgrade in self.upgrades)
+        if affordable != self.affordable:
+            self.affordable = affordable
+            self.invalidate()
+
+    def option_rect(self, i):
+        """Screen rect of the i-th option."""
+        return pygame.Rect(self.rect.x + 10, self.rect.y + 10 + i * 40, self.rect.width - 20, 30)
+
+    def upgrade_at(self, pos):
+        """Return the Upgrade whose row contains pos, or None."""
+        row, offset = divmod(pos[1] - self.rect.y - 10, 40)
+        if 0 <= row < len(self.upgrades) and offset < 30 and self.option_rect(row).collidepoint(pos):
+            return self.upgrades[row]
+        return None
+
+    def render(self):
+        surface = pygame.Surface(self.rect.size)
+        local = surface.get_rect()
+        pygame.draw.rect(surface, WHITE, local)
+        pygame.draw.rect(surface, BLACK, local, 2)
+        for i, text_surface in enumerate(self._label_surfaces):
+            option_rect = self.option_rect(i).move(-self.rect.x, -self.rect.y)
+            pygame.draw.rect(surface, GREEN if self.affordable[i] else RED, option_rect)
+            pygame.draw.rect(surface, BLACK, option_rect, 2)
+            surface.blit(text_surface, text_surface.get_rect(center=option_rect.center))
+        return surface
+
+
+class UIRoot:
+    def __init__(self, cell_size=50):
+        """
+        The retained UI tree: widgets in draw order plus a grid index for hit testing.
+        - The index maps screen cells to the widgets covering them and is rebuilt only
+          after a layout change, so resolving a click is one dictionary lookup.
+        """
+        self.cell_size = cell_size
+        self.widgets = []
+        self._index = None
+
+    def add(self, widget):
+        widget.root = self
+        self.widgets.append(widget)
+        self.invalidate_layout()
+        return widget
+
+    def invalidate_layout(self):
+        self._index = None
+
+    def _build_index(self):
+        index = {}
+        size = self.cell_size
+        for widget in reversed(self.widgets):  # Topmost first
+            if not widget.visible:
+                continue
+            rect = widget.rect
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                    index.setdefault((cx, cy), []).append(widget)
+        return index
+
+    def hit_test(self, pos):
+        """Return the topmost visible widget under pos, or None."""
+        if self._index is None:
+            self._index = self._build_index()
+        for widget in self._index.get((pos[0] // self.cell_size, pos[1] // self.cell_size), ()):
+            if widget.rect.collidepoint(pos):
+                return widget
+        return None
+
+    def draw(self, screen):
+        """Blit every visible widget's cached surface."""
+        for widget in self.widgets:
+            if widget.visible:
+                widget.draw(screen)
@@ -0,0 +1,211 @@
+class Upgrade:
+    def __init__(self, name, cost, effect, target, action):
+        """
+        Represents a single upgrade.
+        :param name: Name of the upgrade (e.g., "Health +50").
+        :param cost: Cost of the upgrade.
+        :param effect: Effect description or value (for UI purposes).
+        :param target: The entity this upgrade applies to (e.g., "Tower", "Troop").
+        :param action: A callable, action(state, side), that applies the upgrade to one side of a GameState.
+        """
+        self.name = name
+        self.cost = cost
+        self.effect = effect
+        self.target = target
+        self.action = action  # A function to apply the upgrade
+
+
+class UpgradeSystem:
+    def __init__(self):
+        self.upgrades = {}  # Dictionary of upgrades by entity
+
+    def add_upgrade(self, entity_name, upgrade):
+        """
+        Add an upgrade to a specific entity.
+        :param entity_name: The name of the entity (e.g., "Tower1", "Troops").
+        :param upgrade: An Upgrade object to be added.
+        """
+        if entity_name not in self.upgrades:
+            self.upgrades[entity_name] = []
+        self.upgrades[entity_name].append(upgrade)
+
+    def get_upgrades(self, entity_name):
+        """
+        Get all upgrades available for a specific entity.
+        :param entity_name: The name of the entity.
+        :return: List of upgrades for the entity.
+        """
+        return self.upgrades.get(entity_name, [])
+
+    def upgrade_key(self, entity_name, upgrade):
+        """
+        Get a compact, order-based key for an upgrade, suitable for sending over the network.
+        :param entity_name: The name of the entity.
+        :param upgrade: An Upgrade registered for that entity.
+        :return: (entity index, upgrade index) in registration order.
+        """
+        return list(self.upgrades).index(entity_name), self.upgrades[entity_name].index(upgrade)
+
+    def find_key(self, upgrade):
+        """
+        Get the key of a registered upgrade without knowing its entity.
+        :param upgrade: An Upgrade object.
+        :return: (entity index, upgrade index), or None if it isn't registered.
+        """
+        for entity_index, upgrades in enumerate(self.upgrades.values()):
+            if upgrade in upgrades:
+                return entity_index, upgrades.index(upgrade)
+        return None
+
+    def upgrade_by_key(self, key):
+        """
+        Look up an upgrade from a key made by upgrade_key.
+        :param key: (entity index, upgrade index).
+        :return: The Upgrade object, or None if the key is out of range.
+        """
+        entity_index, upgrade_index = key
+        entity_names = list(self.upgrades)
+        if entity_index >= len(entity_names):
+            return None
+        upgrades = self.upgrades[entity_names[entity_index]]
+        return upgrades[upgrade_index] if upgrade_index < len(upgrades) else None
+
+    def apply_upgrade(self, upgrade, player_money, state, side):
+        """
+        Apply a selected upgrade if the player has enough money.
+        :param upgrade: The selected Upgrade object.
+        :param player_money: The player's current money.
+        :param state: The GameState the upgrade applies to.
+        :param side: The side buying it (0 = player, 1 = enemy).
+        :return: Updated player money after applying the upgrade.
+        """
+        if player_money >= upgrade.cost:
+            if upgrade.action(state, side) is False:  # Execute the upgrade's logic (e.g., `tower.apply_upgrade`)
+                return player_money  # Nothing to upgrade any more (e.g. the tower was destroyed)
+            print(f"Applying upgrade: {upgrade.name}")
+            return player_money - upgrade.cost  # Deduct the cost
+        return player_money  # No deduction if insufficient funds
+
+
+def build_upgrade_system():
+    """
+    Register the upgrades a side can buy.
+    Both sides of every match share the one table: actions receive the GameState and side
+    (0 = player, 1 = enemy) they apply to, so the table holds no per-match state.
+    Entries are registered in a fixed order so UpgradeSystem.upgrade_key is the same on every peer.
+    """
+    upgrade_system = UpgradeSystem()
+
+    # Looked up on every purchase: tower lists are replaced as towers are destroyed
+    def upgrade_structure(state, side, slot, upgrade):
+        # Structures are found by id, so a destroyed one stays destroyed instead of its neighbour
+        # taking its place; remote inputs can still name it, and must be a no-op on every peer
+        tower = state.structure(side, slot)
+        if tower is None:
+            return False
+        return tower.apply_upgrade(upgrade, money(state, side))
+
+    def troops(state, side):
+        return state.enemy_troops if side else state.player_troops
+
+    def money(state, side):
+        return state.enemy_money if side else state.player_money
+
+    # Add upgrades for entities
+    # TOWER 1
+    upgrade_system.add_upgrade("tower1", Upgrade(
+        name="Health +50",
+        cost=50,
+        effect="Increases health by 50",
+        target="T1",
+        action=lambda state, side: upgrade_structure(state, side, 0, "health")
+    ))
+    upgrade_system.add_upgrade("tower1", Upgrade(
+        name="AP +1",
+        cost=75,
+        effect="Increases attack power by 1",
+        target="T1",
+        action=lambda state, side: upgrade_structure(state, side, 0, "attack")
+    ))
+    upgrade_system.add_upgrade("tower1", Upgrade(
+        name="SpR -200",
+        cost=100,
+        effect="Decrease Spawn Interval",
+        target="T1",
+        action=lambda state, side: upgrade_structure(state, side, 0, "spawn_rate")
+    ))
+
+    #TOWER 2
+    upgrade_system.add_upgrade("tower2", Upgrade(
+        name="Health +50",
+        cost=50,
+        effect="Increases health by 50",
+        target="T2",
+        action=lambda state, side: upgrade_structure(state, side, 1, "health")
+    ))
+    upgrade_system.add_upgrade("tower2", Upgrade(
+        name="Attack Power +1",
+        cost=75,
+        effect="Increases attack power by 1",
+        target="T2",
+        action=lambda state, side: upgrade_structure(state, side, 1, "attack")
+    ))
+    upgrade_system.add_upgrade("tower2", Upgrade(
+        name="SpR -200",
+        cost=100,
+        effect="Decrease Spawn Interval",
+        target="T2",
+        action=lambda state, side: upgrade_structure(state, side, 1, "spawn_rate")
+    ))
+
+    #MAIN BASE
+    upgrade_system.add_upgrade("base", Upgrade(
+        name="Health +50",
+        cost=50,
+        effect="Increases health by 50",
+        target="B",
+        action=lambda state, side: upgrade_structure(state, side, -1, "health")
+    ))
+    upgrade_system.add_upgrade("base", Upgrade(
+        name="Attack Power +1",
+        cost=75,
+        effect="Increases attack power by 1",
+        target="B",
+        action=lambda state, side: upgrade_structure(state, side, -1, "attack")
+    ))
+    upgrade_system.add_upgrade("base", Upgrade(
+        name="SpR -200",
+        cost=100,
+        effect="Decrease Spawn Interval",
+        target="B",
+        action=lambda state, side: upgrade_structure(state, side, -1, "spawn_rate")
+    ))
+
+    #TROOPS
+    upgrade_system.add_upgrade("troops", Upgrade(
+        name="Health +5",
+        cost=50,
+        effect="Increases troop health by 5",
+        target="Trp",
+        action=lambda state, side: [troop.apply_upgrade("health", money(state, side)) for troop in troops(state, side)]
+    ))
+    upgrade_system.add_upgrade("troops", Upgrade(
+        name="Speed +0.1",
+        cost=75,
+        effect="Increases troop speed by 0.1",
+        target="Trp",
+        action=lambda state, side: [troop.apply_upgrade("speed", money(state, side)) for troop in troops(state, side)]
+    ))
+    upgrade_system.add_upgrade("troops", Upgrade(
+        name="Attack +1",
+        cost=100,
+        effect="Increases troop attack power by 1",
+        target="Trp",
+        action=lambda state, side: [troop.apply_upgrade("attack", money(state, side)) for troop in troops(state, side)]
+    ))
+
+    return upgrade_system
+
+
+# Read-only and shared by every match in the process
+UPGRADE_SYSTEM = build_upgrade_system()
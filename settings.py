@@ -0,0 +1,89 @@
+# Screen dimensions and settings
+SCREEN_WIDTH = 500
+SCREEN_HEIGHT = 800
+FPS = 60
+
+# Colors
+WHITE = (255, 255, 255)
+BROWN = (150,75,0)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+
+# Game Variables
+TOWER_SIZE = 50
+BASE_SIZE = 100
+MONEY_INCREMENT = 10
+
+# Simulation
+SIMULATION_THREADED = True  # Run the simulation on a worker thread and render snapshots
+SIMULATION_TICK_RATE = FPS  # Simulation ticks per second (troop speeds are tuned per tick)
+
+# Map and camera
+MAP_WIDTH = SCREEN_WIDTH  # World size; make it larger than the screen to scroll around the battlefield
+MAP_HEIGHT = SCREEN_HEIGHT
+LANE_COUNT = 2  # Lanes with a tower at each end, spread across the map width
+TOWERS_PER_LANE = 1  # Towers per side in each lane
+LANE_TOWER_SPACING = 150  # Distance between consecutive towers in a lane
+CAMERA_PAN_SPEED = 600  # Pixels per second when scrolling with the keyboard
+CAMERA_ZOOM_STEP = 1.1  # Zoom factor per mouse wheel notch
+CAMERA_MIN_ZOOM = 0.25
+CAMERA_MAX_ZOOM = 2.0
+
+# Crowd level of detail
+CROWD_LOD_THRESHOLD = 8  # Troops of one team in a cell before they are drawn as a single cluster (0 disables)
+CROWD_CELL_SIZE = 40  # Cluster cell size in screen pixels
+
+# Lockstep multiplayer
+NETPLAY_PORT = 50007
+NETPLAY_INPUT_DELAY = 4  # Ticks between an input being made and taking effect on every peer
+
+# Spectator stream
+SPECTATOR_ENABLED = False  # Publish live state over UDP (watch with: python -m game.spectator)
+SPECTATOR_PORT = 50017
+SPECTATOR_KEYFRAME_INTERVAL = 30  # Ticks between full keyframes
+SPECTATOR_POSITION_SCALE = 4  # Positions are quantized to 1/4 world unit
+SPECTATOR_DATAGRAM_SIZE = 1200  # Frames are split into datagrams of at most this many bytes (below a typical MTU)
+
+# Match telemetry
+TELEMETRY_ENABLED = True  # Record per-tick counters and save them when the game exits
+TELEMETRY_CAPACITY = 36000  # Rows kept (10 minutes at 60 ticks/s); longer matches are downsampled
+TELEMETRY_DIR = "telemetry"  # Where match_<timestamp>.bvrt files are written (see game.telemetry.load_telemetry)
+
+# Troop steering
+FLOW_FIELDS_ENABLED = True  # Steer troops towards enemy structures with precomputed per-team flow fields
+FLOW_FIELD_CELL_SIZE = 10  # Flow field resolution in world units
+
+# Troop target acquisition
+AI_REACQUIRE_FRACTION = 0.25  # Fraction of troops that rescan for targets each tick (1.0 = every troop, every tick)
+AI_REACQUIRE_BUDGET = 200  # Most troops allowed to rescan in one tick; the interval stretches beyond that
+AI_REACQUIRE_MAX_INTERVAL = 15  # Never wait longer than this many ticks between rescans
+
+# Adaptive quality (steps through game.quality.LEVELS when frames run over 1 / FPS)
+QUALITY_GOVERNOR_ENABLED = True
+QUALITY_DEGRADE_FRAMES = 30  # Frames over budget before giving up a level
+QUALITY_RECOVER_FRAMES = 180  # Frames with headroom before taking a level back
+QUALITY_RECOVER_RATIO = 0.5  # "Headroom" means the average frame uses under this fraction of the budget
+QUALITY_LOD_THRESHOLD = 3  # Crowd LOD threshold at the crowd_lod level
+QUALITY_RENDER_DIVISOR = 2  # Draw one frame in this many at the reduced_render_rate level
+QUALITY_VOICES = 2  # Mixer channels at the fewer_voices level
+QUALITY_SEPARATION_INTERVAL = 3  # Ticks between ally separation checks at the coarse_separation level
+
+# Memory accounting
+MEMORY_MONITOR_ENABLED = False  # Trace allocations and print entity counts, sizes and cache sizes (slow)
+MEMORY_SAMPLE_SECONDS = 10  # Seconds between samples
+MEMORY_TREND_WINDOW = 30  # Samples a series must keep growing over before it is flagged
+MEMORY_GROWTH_THRESHOLD = 0.2  # Growth across the window (as a fraction) that counts as a leak suspect
+AUDIO_CACHE_SIZE = 16  # Sounds kept loaded by the AudioManager
+
+# Differential harness (python -m game.harness)
+HARNESS_POSITION_TOLERANCE = 1.0  # World units a fast backend's troop may drift from the reference
+HARNESS_HEALTH_TOLERANCE = 0.5  # Health difference allowed per troop and structure
+HARNESS_TICKS = 600  # Ticks simulated per scenario
+HARNESS_WINDOW = 60  # Ticks between aggregate checkpoints for backends that change decisions by design
+
+# Match hosting (python -m game.host)
+HOST_CPU_BUDGET = 0.8  # Fraction of each 1 / SIMULATION_TICK_RATE cycle spent stepping matches
+HOST_MAX_CATCH_UP = 3  # Most ticks one match may run in a cycle when it fell behind
+HOST_STATS_SECONDS = 5  # Window for per-match tick rate stats
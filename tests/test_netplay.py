@@ -0,0 +1,80 @@
+import socket
+import threading
+import time
+
+from game.netplay import LockstepSession, start_loopback_server
+from game.state import GameState
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def connect_peers(port, input_delay=2):
+    """Connect two LockstepSessions to a loopback server. connect() blocks until both have joined."""
+    sessions = [LockstepSession("127.0.0.1", port, input_delay) for _ in range(2)]
+    threads = [threading.Thread(target=session.connect, args=(5,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(session.side is not None for session in sessions)
+    return sorted(sessions, key=lambda session: session.side)
+
+
+def fingerprint(state):
+    return (
+        state.tick, state.player_money, state.enemy_money, state.outcome,
+        [(tower.id, tower.health, tower.max_health) for tower in state.player_towers + state.enemy_towers],
+        [(troop.uid, troop.x, troop.y, troop.health) for troop in state.player_troops + state.enemy_troops],
+    )
+
+
+def run_lockstep(sessions, states, local_inputs, ticks, timeout=10):
+    """Step each peer the way main() does: wait for every side's inputs, send our own, simulate."""
+    deadline = time.monotonic() + timeout
+    while any(state.tick < ticks for state in states):
+        assert time.monotonic() < deadline, "peers stalled"
+        for session, state in zip(sessions, states):
+            if state.tick >= ticks:
+                continue
+            inputs = session.inputs_for(state.tick + 1)
+            if inputs is None:
+                continue
+            session.send_inputs(state.tick + 1, local_inputs(session.side, state.tick + 1))
+            state.step(inputs)
+        time.sleep(0.001)
+
+
+def test_upgrade_for_destroyed_tower_is_a_no_op_on_both_peers():
+    port = free_port()
+    server = start_loopback_server(port)
+    sessions = connect_peers(port)
+    states = [GameState(enemy_upgradeable=True) for _ in sessions]
+    try:
+        for state in states:
+            tower = state.structure(1, 1)  # The enemy side's second tower ("tower2")
+            tower.take_damage(tower.health)
+        # One tick for the destroyed tower to be cleared away before any inputs land
+        run_lockstep(sessions, states, lambda side, tick: [], ticks=1)
+        assert all(state.structure(1, 1) is None for state in states)
+
+        def local_inputs(side, tick):
+            # The enemy side keeps trying to upgrade its destroyed tower ("tower2" health), the
+            # player upgrades a standing one
+            if tick == 5:
+                return [(1, 0)] if side == 1 else [(0, 0)]
+            return []
+
+        money = states[0].enemy_money
+        run_lockstep(sessions, states, local_inputs, ticks=30)
+
+        assert fingerprint(states[0]) == fingerprint(states[1])
+        assert states[0].enemy_money == money  # Nothing was upgraded, so nothing was charged
+        assert states[0].structure(0, 0).max_health == 150  # The player's upgrade still applied
+    finally:
+        for session in sessions:
+            session.close()
+        server.close()